@@ -1,13 +1,24 @@
 import contextvars
-from typing import List, Union, Set
+import importlib
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple, Union
 from graphviz import Digraph
 from sqlitedict import SqliteDict
 from hashlib import md5
 from IPython.display import display, Image
 from loguru import logger
+from feature_graph.compact_graph import CompactGraph, is_reachable
+from feature_graph.hooks import FeatureDAGHooks
 
 __dag = contextvars.ContextVar("dag")
 
+COMPILED_DAG_VERSION = 1
+
 
 def get_dag() -> "FeatureDAG":
     """Gets the FeatureDAG set by the current context manager
@@ -42,8 +53,11 @@ class FeatureDAG:
             Defaults to ":memory:".
         """
 
-        self._nodes = set()
-        self._node_connections = set()
+        self._nodes = []
+        self._node_index = {}
+        self._children = []
+        self._parents = []
+        self._graph = None
         self._node_dot_attr = {}
         self._dot = None
         self._ipython_display_handle = None
@@ -51,6 +65,98 @@ class FeatureDAG:
         self._state_dict = SqliteDict(
             state_db, autocommit=True, encode=str, decode=str, tablename="state"
         )
+        self._state_db = state_db
+        self._state_tables = {}
+        self._runs_dict = self._state_table("runs")
+        self._hooks = []
+
+    def _state_table(self, tablename: str) -> SqliteDict:
+        """Returns a table in the state database holding JSON values
+
+        Args:
+            tablename (str): The name of the table
+
+        Returns:
+            SqliteDict: The table
+        """
+        if tablename not in self._state_tables:
+            self._state_tables[tablename] = SqliteDict(
+                self._state_db,
+                autocommit=True,
+                encode=json.dumps,
+                decode=json.loads,
+                tablename=tablename,
+            )
+        return self._state_tables[tablename]
+
+    def add_hooks(self, hooks: FeatureDAGHooks) -> None:
+        """Registers callbacks to be made as the DAG plans and runs
+
+        Args:
+            hooks (FeatureDAGHooks): The callbacks, eg a `feature_graph.tracing.Tracer`
+        """
+        self._hooks.append(hooks)
+
+    def remove_hooks(self, hooks: FeatureDAGHooks) -> None:
+        """Unregisters callbacks added with `add_hooks`
+
+        Args:
+            hooks (FeatureDAGHooks): The callbacks to remove
+
+        Raises:
+            ValueError: If the callbacks aren't registered
+        """
+        self._hooks.remove(hooks)
+
+    def _call_hooks(self, callback: str, *args: Any) -> None:
+        """Makes a callback on every registered set of hooks
+
+        Callers check `self._hooks` first, so a DAG without hooks only pays for that
+        check.
+
+        Args:
+            callback (str): The name of the FeatureDAGHooks method to call
+            *args (Any): The arguments of the callback
+        """
+        for hooks in self._hooks:
+            getattr(hooks, callback)(*args)
+
+    def _calc_cache_tag(self, node: "FeatureNode") -> str:
+        """Calculates a node's current cache tag, timing it if hooks are registered
+
+        Args:
+            node (FeatureNode): The node
+
+        Returns:
+            str: The node's current cache tag
+        """
+        if not self._hooks:
+            return node._calc_current_cache_tag()
+
+        started = time.perf_counter()
+        cache_tag = node._calc_current_cache_tag()
+        self._call_hooks(
+            "on_tag_computed", node, cache_tag, time.perf_counter() - started
+        )
+        return cache_tag
+
+    def _write_cache_tag(self, node: "FeatureNode", cache_tag: str) -> None:
+        """Writes a node's new cache tag to the state, timing it if hooks are
+        registered
+
+        Args:
+            node (FeatureNode): The node
+            cache_tag (str): The node's new cache tag
+        """
+        if not self._hooks:
+            node._update_cache(cache_tag)
+            return
+
+        started = time.perf_counter()
+        node._update_cache(cache_tag)
+        self._call_hooks(
+            "on_state_write", node, cache_tag, time.perf_counter() - started
+        )
 
     @property
     def dag_params(self) -> dict:
@@ -89,63 +195,643 @@ class FeatureDAG:
             ValueError: "Two nodes can't have the same name"
         """
 
-        if node in self._nodes:
+        if node._index is not None:
             raise ValueError("The same node can't be added to the DAG twice")
-        if node.name in [n.name for n in self._nodes]:
+        if node.name in self._node_index:
             raise ValueError("Two nodes can't have the same name")
 
-        self._nodes.add(node)
+        self._thaw()
+        node._node_id = md5(node.name.lower().encode("utf-8")).hexdigest()
+        node._index = len(self._nodes)
+        self._nodes.append(node)
+        self._node_index[node.name] = node._index
+        self._children.append([])
+        self._parents.append([])
+
+    def freeze(self) -> CompactGraph:
+        """Builds the compact, array backed topology of the DAG
+
+        While nodes and connections are being added the topology is held as lists of
+        node indices. Freezing converts it to CSR arrays, which are used for
+        traversal and scheduling, and checks the topology can be sorted. Adding nodes
+        or connections after freezing automatically thaws the DAG.
+
+        Raises:
+            ValueError: If the DAG contains a cycle
+
+        Returns:
+            CompactGraph: The frozen topology of the DAG
+        """
+
+        if self._graph is None:
+            graph = CompactGraph.from_adjacency(self._children)
+            graph.topological_order()
+            self._graph = graph
+            self._children = None
+            self._parents = None
+        return self._graph
+
+    def _thaw(self) -> None:
+        "Converts a frozen topology back to lists so it can be modified"
+
+        if self._graph is not None:
+            self._children = self._graph.to_adjacency()
+            self._parents = self._graph.to_adjacency(parents=True)
+            self._graph = None
+
+    def _child_indices(self, index: int):
+        """Returns the indices of a node's children
+
+        Args:
+            index (int): The index of the node
+
+        Returns:
+            Sequence[int]: The indices of the node's children
+        """
+        if self._graph is not None:
+            return self._graph.children[index]
+        return self._children[index]
+
+    def _parent_indices(self, index: int):
+        """Returns the indices of a node's parents
+
+        Args:
+            index (int): The index of the node
+
+        Returns:
+            Sequence[int]: The indices of the node's parents
+        """
+        if self._graph is not None:
+            return self._graph.parents[index]
+        return self._parents[index]
 
     def compact_state(self) -> None:
-        "Removes any nodes in the state that aren't in the DAGs current list of nodes"
-        dag_node_ids = [n.node_id for n in self._nodes]
-        for node_id in self._state_dict.keys():
-            if node_id not in dag_node_ids:
-                del self._state_dict[node_id]
+        """Removes any nodes in the state that aren't in the DAGs current list of nodes
+
+        Keys of the form "<node_id>/<sub key>", used by nodes that store more than one
+        cache tag, are kept if the node is in the DAG.
+        """
+        dag_node_ids = {n.node_id for n in self._nodes}
+        for state in [self._state_dict, self._runs_dict]:
+            for key in state.keys():
+                if key.split("/", 1)[0] not in dag_node_ids:
+                    del state[key]
+
+    def get_node(self, name: str) -> "FeatureNode":
+        """Returns the node with the given name
+
+        Args:
+            name (str): The name of the node
+
+        Raises:
+            KeyError: If there is no node with the name in the DAG
+
+        Returns:
+            FeatureNode: The node
+        """
+        if name not in self._node_index:
+            raise KeyError("Node {} is not in the DAG".format(name))
+        return self._nodes[self._node_index[name]]
+
+    def _target_mask(self, targets: Iterable[str] = None) -> bytearray:
+        """Returns a mask of the nodes needed to build a set of target nodes
+
+        Args:
+            targets (Iterable[str], optional): The names of the target nodes. If not
+            supplied then every node is needed. Defaults to None.
+
+        Returns:
+            bytearray: A mask with 1 for every target node and every ancestor of one
+        """
+
+        graph = self.freeze()
+        if targets is None:
+            return bytearray(b"\x01") * graph.n_nodes
+
+        target_indices = [self.get_node(name)._index for name in targets]
+        mask = graph.ancestors(target_indices)
+        for index in target_indices:
+            mask[index] = 1
+        return mask
+
+    def plan(self, targets: Iterable[str] = None) -> List[Tuple["FeatureNode", bool]]:
+        """Lists the nodes a run would consider and whether each is currently stale
 
-    def run_feature_graph(self, display_dag: bool = False) -> None:
+        A node that is fresh now may still run if one of its parents runs first and
+        changes the node's inputs.
+
+        Args:
+            targets (Iterable[str], optional): The names of the nodes to build. Only
+            these and their ancestors are planned. If not supplied then every node is
+            planned. Defaults to None.
+
+        Returns:
+            List[Tuple[FeatureNode, bool]]: The nodes in topological order, each with
+            True if it is stale, False otherwise
+        """
+
+        report = self.staleness_report(targets=targets)
+        return [(self._nodes[n.index], n.is_stale) for n in report.nodes]
+
+    def staleness_report(
+        self, max_workers: int = 8, targets: Iterable[str] = None
+    ) -> "StalenessReport":
+        """Checks which nodes are stale
+
+        The current cache tag of every node is calculated concurrently, which for
+        nodes such as BigQueryNode means the table metadata requests are made in
+        parallel.
+
+        Args:
+            max_workers (int, optional): The number of threads used to calculate the
+            cache tags. Defaults to 8.
+            targets (Iterable[str], optional): The names of the nodes to check. Only
+            these and their ancestors are checked. If not supplied then every node is
+            checked. Defaults to None.
+
+        Returns:
+            StalenessReport: The staleness of each node, in topological order
+        """
+
+        if self._hooks:
+            self._call_hooks("on_plan_start", targets)
+
+        graph = self.freeze()
+        mask = self._target_mask(targets)
+        order = [i for i in graph.topological_order() if mask[i]]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            current_cache_tags = list(
+                executor.map(lambda i: self._calc_cache_tag(self._nodes[i]), order)
+            )
+
+        upstream_stale = bytearray(graph.n_nodes)
+        nodes = []
+        for index, current_cache_tag in zip(order, current_cache_tags):
+            node = self._nodes[index]
+            state_cache_tag = node._get_state_cache_tag
+            is_stale = current_cache_tag != state_cache_tag
+            if is_stale or upstream_stale[index]:
+                for child in graph.children[index]:
+                    upstream_stale[child] = 1
+            nodes.append(
+                NodeStaleness(
+                    name=node.name,
+                    node_id=node.node_id,
+                    index=index,
+                    current_cache_tag=current_cache_tag,
+                    state_cache_tag=state_cache_tag,
+                    is_stale=is_stale,
+                    is_upstream_stale=bool(upstream_stale[index]),
+                )
+            )
+
+        if self._hooks:
+            self._call_hooks("on_plan_end")
+
+        return StalenessReport(dag=self, nodes=nodes)
+
+    def infer_edges(
+        self, max_workers: int = 8
+    ) -> List[Tuple["FeatureNode", "FeatureNode"]]:
+        """Connects nodes that read a table to the node that writes it
+
+        Each node's tables are found with its `_table_lineage`, eg BigQueryNodes dry
+        run their queries. These are looked up concurrently. Existing connections are
+        kept, so inferred edges can be mixed with ones made with `>>`.
+
+        Args:
+            max_workers (int, optional): The number of nodes to look up at once.
+            Defaults to 8.
+
+        Raises:
+            ValueError: If two nodes write the same table
+            ValueError: If an inferred edge would create a cycle
+
+        Returns:
+            List[Tuple[FeatureNode, FeatureNode]]: The parent and child of each edge
+            that was added
+        """
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            lineages = list(executor.map(lambda n: n._table_lineage(), self._nodes))
+
+        producers = {}
+        for node, (_, produced) in zip(self._nodes, lineages):
+            for table in produced:
+                if table in producers:
+                    raise ValueError(
+                        "Nodes {} and {} both write to {}".format(
+                            producers[table].name, node.name, table
+                        )
+                    )
+                producers[table] = node
+
+        added = []
+        for node, (consumed, _) in zip(self._nodes, lineages):
+            for table in consumed:
+                producer = producers.get(table, None)
+                if producer is None or producer is node:
+                    continue
+                if producer._index in self._parent_indices(node._index):
+                    continue
+                producer >> node
+                added.append((producer, node))
+
+        return added
+
+    def last_runs(self) -> dict:
+        """Returns the record of the last time each node ran
+
+        Returns:
+            dict: For each node ID, a dict with the node's name, the UTC start and
+            finish times of its last run in ISO format, the run's duration in seconds
+            and its status
+        """
+        return dict(self._runs_dict.items())
+
+    def compile(self, path: str) -> None:
+        """Saves the validated DAG to a compiled file so it can be loaded quickly
+
+        The compiled file holds the DAG parameters, the topology and each node's
+        metadata, including any rendered queries. It also records the size, last
+        modified time and md5 hash of every source file the nodes were built from
+        (eg query files) so the compiled DAG can be invalidated when they change.
+
+        Nodes are restored without calling their constructor, so every FeatureNode
+        subclass must override `_compiled_record` and `_load_compiled`.
+
+        Args:
+            path (str): The path of the compiled file to write
+
+        Raises:
+            TypeError: If a node's class doesn't override `_compiled_record`
+        """
+
+        graph = self.freeze()
+
+        nodes = []
+        sources = {}
+        for node in self._nodes:
+            node_class = type(node)
+            if (
+                node_class is not FeatureNode
+                and node_class._compiled_record is FeatureNode._compiled_record
+            ):
+                raise TypeError(
+                    "{} doesn't override _compiled_record so can't be compiled".format(
+                        node_class.__qualname__
+                    )
+                )
+
+            record = node._compiled_record()
+            record["class"] = object_import_name(node_class)
+            record["name"] = node.name
+            nodes.append(record)
+
+            for source in node._compiled_sources():
+                source = os.path.abspath(source)
+                if source not in sources:
+                    stat = os.stat(source)
+                    sources[source] = {
+                        "mtime_ns": stat.st_mtime_ns,
+                        "size": stat.st_size,
+                        "md5": _file_md5(source),
+                    }
+
+        compiled = {
+            "version": COMPILED_DAG_VERSION,
+            "dag_params": self._dag_params,
+            "nodes": nodes,
+            "children": graph.to_adjacency(),
+            "sources": sources,
+        }
+
+        with open(path, "w") as f:
+            json.dump(compiled, f)
+
+    @classmethod
+    def load_compiled(
+        cls, path: str, state_db: str = ":memory:"
+    ) -> Optional["FeatureDAG"]:
+        """Loads a DAG saved with `compile`
+
+        Loading skips reading query files, rendering queries and validating the
+        connections between nodes. A source file whose size and last modified time
+        are unchanged is trusted, otherwise its md5 hash is compared with the
+        compiled one.
+
+        Args:
+            path (str): The path of the compiled file
+            state_db (str, optional): The name of the sqlite database to store the DAG
+            state in. Defaults to ":memory:".
+
+        Returns:
+            Optional[FeatureDAG]: The loaded DAG, or None if the compiled file doesn't
+            exist, was written by a different version or any of its source files have
+            changed
+        """
+
+        if not os.path.exists(path):
+            return None
+
+        with open(path, "r") as f:
+            compiled = json.load(f)
+
+        if compiled.get("version") != COMPILED_DAG_VERSION:
+            logger.info("Compiled DAG {} has an old version".format(path))
+            return None
+
+        for source, fingerprint in compiled["sources"].items():
+            try:
+                stat = os.stat(source)
+            except FileNotFoundError:
+                logger.info("Compiled DAG source {} no longer exists".format(source))
+                return None
+            if (
+                stat.st_mtime_ns == fingerprint["mtime_ns"]
+                and stat.st_size == fingerprint["size"]
+            ):
+                continue
+            if _file_md5(source) != fingerprint["md5"]:
+                logger.info("Compiled DAG source {} has changed".format(source))
+                return None
+
+        dag = cls(dag_params=compiled["dag_params"], state_db=state_db)
+        node_classes = {}
+        for record in compiled["nodes"]:
+            if record["class"] not in node_classes:
+                node_classes[record["class"]] = import_object(record["class"])
+
+            node = node_classes[record["class"]].__new__(node_classes[record["class"]])
+            node._name = record["name"]
+            node._index = None
+            node._dag = dag
+            dag.add_node(node)
+            node._load_compiled(record)
+
+        dag._children = compiled["children"]
+        dag.freeze()
+
+        return dag
+
+    def run_feature_graph(
+        self,
+        display_dag: bool = False,
+        max_jobs: int = None,
+        targets: Iterable[str] = None,
+        timeout: float = None,
+    ) -> None:
         """Runs the nodes in the DAG
 
-        The function will traverse a DAG starting with leaf nodes and working its way
-        to the root nodes. Once it finds a root node it will work backwards looking for
-        stale nodes in need of running.
+        Nodes are scheduled in dependency order. A node becomes ready once all of its
+        parents have either run or been found fresh, at which point its cache tag is
+        checked and, if stale, the node is submitted. Nodes that support asynchronous
+        submission (eg BigQueryNode) have all their jobs submitted together and are
+        tracked by a single instance of the node's `_job_poller_class`, which checks
+        job states in bulk.
+        Completed nodes release their children as soon as the poller sees them finish.
+
+        The start and finish time of every node that runs is recorded in the state
+        database, see `last_runs`. Callbacks registered with `add_hooks` are made as
+        nodes are queued, checked, run and recorded.
+
+        If a node fails, a node or the run times out or the run is interrupted, eg
+        with Ctrl-C, the jobs of every submitted node still running are cancelled.
+        The failed node is recorded with the status "failed" and the others with
+        "cancelled", and their cache tags aren't updated so they rerun next time.
 
         Args:
             display_dag (bool, optional): Whether to display the running graph in
             ipython. Defaults to False.
-        """
+            max_jobs (int, optional): The maximum number of nodes to have running at
+            once. If not supplied then all ready nodes are submitted. Defaults to
+            None.
+            targets (Iterable[str], optional): The names of the nodes to build. Only
+            these and their ancestors are run. If not supplied then the whole DAG is
+            run. Defaults to None.
+            timeout (float, optional): The maximum number of seconds the run may take.
+            It is checked while waiting for submitted jobs and between nodes, so a
+            node that runs synchronously isn't interrupted. Defaults to None.
 
-        nodes_no_children = [node for node in self._nodes if len(node.children) == 0]
+        Raises:
+            TimeoutError: If the run or a node with a timeout takes too long
+        """
 
-        for node in nodes_no_children:
-            self._walk_graph_query(parent_nodes=node.parents, display_dag=display_dag)
-            if node.is_node_stale:
-                self._run_node(node, display_dag=display_dag)
+        if self._hooks:
+            self._call_hooks("on_run_start", targets)
 
-    def _walk_graph_query(
-        self, parent_nodes: List["FeatureNode"], display_dag: bool = False
+        try:
+            self._schedule(
+                display_dag=display_dag,
+                max_jobs=max_jobs,
+                targets=targets,
+                timeout=timeout,
+            )
+        except BaseException as e:
+            if self._hooks:
+                self._call_hooks("on_run_end", e)
+            raise
+
+        if self._hooks:
+            self._call_hooks("on_run_end", None)
+
+    def _schedule(
+        self,
+        display_dag: bool = False,
+        max_jobs: int = None,
+        targets: Iterable[str] = None,
+        timeout: float = None,
     ) -> None:
-        """Internal function that recursively walks the DAG running any stale nodes
+        """Runs the nodes in the DAG, see `run_feature_graph`
 
         Args:
-            parent_nodes (List[FeatureNode]): A list of a node's parent nodes to
-            recursively walk
             display_dag (bool, optional): Whether to display the running graph in
             ipython. Defaults to False.
+            max_jobs (int, optional): The maximum number of nodes to have running at
+            once. Defaults to None.
+            targets (Iterable[str], optional): The names of the nodes to build.
+            Defaults to None.
+            timeout (float, optional): The maximum number of seconds the run may take.
+            Defaults to None.
+
+        Raises:
+            TimeoutError: If the run or a node with a timeout takes too long
         """
 
-        for node in parent_nodes:
-            self._walk_graph_query(parent_nodes=node.parents)
-            if node.is_node_stale:
-                self._run_node(node, display_dag=display_dag)
+        graph = self.freeze()
+        mask = self._target_mask(targets)
+        remaining_parents = graph.in_degrees()
+        ready = deque(
+            i for i in range(graph.n_nodes) if mask[i] and remaining_parents[i] == 0
+        )
+        pollers = {}
+        in_flight = {}
+        running = {}
+        hooks = self._hooks
+        run_deadline = time.monotonic() + timeout if timeout is not None else None
+
+        if hooks:
+            for index in ready:
+                self._call_hooks("on_node_ready", self._nodes[index])
+
+        def complete(index: int) -> None:
+            for child in graph.children[index]:
+                remaining_parents[child] -= 1
+                if remaining_parents[child] == 0 and mask[child]:
+                    ready.append(child)
+                    if hooks:
+                        self._call_hooks("on_node_ready", self._nodes[child])
+
+        def finish(index: int, cache_tag: str, started: datetime) -> None:
+            node = self._nodes[index]
+            self._write_cache_tag(node, cache_tag)
+            self._record_run(node, started)
+            if hooks:
+                self._call_hooks("on_node_end", node, "success")
+            complete(index)
+
+        def check_deadlines() -> None:
+            now = time.monotonic()
+            if run_deadline is not None and now > run_deadline:
+                raise TimeoutError("The run timed out after {}s".format(timeout))
+            for index, (_, _, _, deadline) in in_flight.items():
+                if deadline is not None and now > deadline:
+                    node = self._nodes[index]
+                    raise TimeoutError(
+                        "Node {} timed out after {}s".format(node.name, node._timeout)
+                    )
 
-    def _run_node(self, node: "FeatureNode", display_dag: bool = False) -> None:
-        """Runs
+        try:
+            while ready or in_flight:
+
+                while ready and (max_jobs is None or len(in_flight) < max_jobs):
+                    check_deadlines()
+                    index = ready.popleft()
+                    node = self._nodes[index]
+                    current_cache_tag = self._calc_cache_tag(node)
+                    if current_cache_tag == node._get_state_cache_tag:
+                        complete(index)
+                        continue
+
+                    started = datetime.now(timezone.utc)
+                    if hooks:
+                        self._call_hooks("on_node_start", node)
+                    running[index] = started
+                    jobs = self._run_node(node, display_dag=display_dag)
+                    if not jobs:
+                        del running[index]
+                        finish(index, current_cache_tag, started)
+                        continue
+
+                    poller_class = node._job_poller_class
+                    if poller_class is None:
+                        raise TypeError(
+                            "Node {} submitted jobs but has no _job_poller_class".format(
+                                node.name
+                            )
+                        )
+                    if poller_class not in pollers:
+                        pollers[poller_class] = poller_class()
+                    for job in jobs:
+                        pollers[poller_class].add(job, node)
+                    del running[index]
+                    deadline = (
+                        time.monotonic() + node._timeout
+                        if node._timeout is not None
+                        else None
+                    )
+                    in_flight[index] = [current_cache_tag, len(jobs), started, deadline]
+
+                if not in_flight:
+                    break
+
+                active_pollers = [p for p in pollers.values() if len(p) > 0]
+                deadlines = [d for _, _, _, d in in_flight.values() if d is not None]
+                if run_deadline is not None:
+                    deadlines.append(run_deadline)
+                wake_at = min([p.next_poll_at for p in active_pollers] + deadlines)
+                wait = wake_at - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+
+                for poller in active_pollers:
+                    if poller.next_poll_at > time.monotonic():
+                        continue
+                    for job, node in poller.poll():
+                        follow_up_jobs = node._on_job_done(job)
+                        for follow_up_job in follow_up_jobs:
+                            poller.add(follow_up_job, node)
+                        in_flight[node._index][1] += len(follow_up_jobs) - 1
+                        if in_flight[node._index][1] == 0:
+                            cache_tag, _, started, _ = in_flight.pop(node._index)
+                            finish(node._index, cache_tag, started)
+
+                check_deadlines()
+
+        except BaseException:
+            self._cancel_run(pollers, in_flight, running)
+            raise
+
+    def _cancel_run(
+        self, pollers: dict, in_flight: dict, running: Dict[int, datetime]
+    ) -> None:
+        """Cancels the jobs of every submitted node and records how each node ended
+
+        Args:
+            pollers (dict): The job pollers of the run
+            in_flight (dict): The submitted nodes, keyed by node index
+            running (Dict[int, datetime]): The node that was running or submitting
+            when the run stopped, if any, and when it started
+        """
+
+        failed = {node._index for p in pollers.values() for _, node in p.failed}
+        for poller in pollers.values():
+            poller.cancel_all()
+
+        ended = [(index, started) for index, started in running.items()]
+        ended += [(index, v[2]) for index, v in in_flight.items()]
+        for index, started in ended:
+            node = self._nodes[index]
+            status = "failed" if index in failed or index in running else "cancelled"
+            logger.warning("Node {} {}".format(node.name, status))
+            self._record_run(node, started, status=status)
+            if self._hooks:
+                self._call_hooks("on_node_end", node, status)
+
+    def _record_run(
+        self, node: "FeatureNode", started: datetime, status: str = "success"
+    ) -> None:
+        """Records a node's run in the state database
+
+        Args:
+            node (FeatureNode): The node that ran
+            started (datetime): When the node started running
+            status (str, optional): How the run ended. Defaults to "success".
+        """
+
+        finished = datetime.now(timezone.utc)
+        self._runs_dict[node.node_id] = {
+            "name": node.name,
+            "started": started.isoformat(),
+            "finished": finished.isoformat(),
+            "duration": (finished - started).total_seconds(),
+            "status": status,
+        }
+
+    def _run_node(
+        self, node: "FeatureNode", display_dag: bool = False
+    ) -> Optional[List[Any]]:
+        """Runs or submits a node
 
         Args:
             node (FeatureNode): The node to be run
             display_dag (bool, optional): Whether to display the node in a ipython
             notebook. Defaults to False.
+
+        Returns:
+            Optional[List[Any]]: The jobs submitted for the node, or None if the node
+            ran to completion synchronously
         """
 
         if display_dag:
@@ -154,11 +840,7 @@ class FeatureDAG:
 
         logger.info("Running query {}".format(node.name))
 
-        current_cache_tag = node._calc_current_cache_tag()
-
-        node.run()
-
-        node._update_cache(current_cache_tag)
+        return node._submit()
 
     def _ipython_display_dot(self) -> None:
         "Display the dot diagram with a ipython display handle"
@@ -170,72 +852,306 @@ class FeatureDAG:
         else:
             self._ipython_display_handle = display(img, display_id="fg_dot_diagram")
 
-    def _repr_png_(self):
+    def _repr_png_(self, node_dot_attr: dict = None):
+
+        if node_dot_attr is None:
+            node_dot_attr = self._node_dot_attr
 
         self._dot = Digraph()
         for node in self._nodes:
             self._dot.node(
                 name=node.node_id,
-                label=node.name,
-                _attributes=self._node_dot_attr.get(node.node_id, None),
+                label=node._dot_label,
+                _attributes=node_dot_attr.get(node.node_id, None),
             )
 
-        for connection in self._node_connections:
-            self._dot.edge(connection[0], connection[1])
+        for node in self._nodes:
+            for child in self._child_indices(node._index):
+                self._dot.edge(node.node_id, self._nodes[child].node_id)
 
         return self._dot.pipe(format="png")
 
     def _connect_node(
         self, parent_node: "FeatureNode", child_node: "FeatureNode"
     ) -> None:
-        """Connects two nodes in the diagram
+        """Connects two nodes
 
         Args:
             parent_node (FeatureNode): The starting node for the connection arrow
             child_node (FeatureNode): The end node for the connection arrow
         """
-        self._node_connections.add((parent_node.node_id, child_node.node_id))
+        self._thaw()
+        self._children[parent_node._index].append(child_node._index)
+        self._parents[child_node._index].append(parent_node._index)
 
-    def _is_node_parent(self, node: "FeatureNode", check_node_id: str) -> bool:
-        """Recursive internal function to check if a node_id is a node's parent or
-        other ancestor
+    def _is_node_ancestor(self, node: "FeatureNode", check_node: "FeatureNode") -> bool:
+        """Checks if a node is another node's parent or other ancestor
 
         Args:
             node (FeatureNode): The possible child node
-            check_node_id (str): The node ID to check if it is a parent or ancestor
+            check_node (FeatureNode): The node to check if it is a parent or ancestor
 
         Returns:
-            bool: True if the check node ID is a parent or ancestor. False otherwise.
+            bool: True if the check node is a parent or ancestor. False otherwise.
         """
+        neighbours = self._graph.parents if self._graph is not None else self._parents
+        return is_reachable(
+            len(self._nodes), node._index, check_node._index, neighbours
+        )
 
-        for parent_node in node.parents:
-            if parent_node.node_id == check_node_id or self._is_node_parent(
-                node=parent_node, check_node_id=check_node_id
-            ):
-                return True
-        return False
-
-    def _is_node_child(self, node: "FeatureNode", check_node_id: str) -> bool:
-        """Recursive internal function to check if a node_id is a node's child or
-        other descendant
+    def _is_node_descendant(
+        self, node: "FeatureNode", check_node: "FeatureNode"
+    ) -> bool:
+        """Checks if a node is another node's child or other descendant
 
         Args:
             node (FeatureNode): The possible parent node
-            check_node_id (str): The node ID to check if it is a child or descendant
+            check_node (FeatureNode): The node to check if it is a child or descendant
 
         Returns:
-            bool: True if the check node ID is a child or descendant. False otherwise.
+            bool: True if the check node is a child or descendant. False otherwise.
         """
+        neighbours = self._graph.children if self._graph is not None else self._children
+        return is_reachable(
+            len(self._nodes), node._index, check_node._index, neighbours
+        )
 
-        for child_node in node.children:
-            if child_node.node_id == check_node_id or self._is_node_child(
-                node=child_node, check_node_id=check_node_id
-            ):
-                return True
-        return False
+
+def object_import_name(obj: Any) -> str:
+    """Returns the name a module level class or function can be imported with
+
+    Args:
+        obj (Any): The class or function
+
+    Raises:
+        TypeError: If the object isn't defined at the top level of a module
+
+    Returns:
+        str: The name in the form "module:qualified.name"
+    """
+    if "<locals>" in obj.__qualname__ or "<lambda>" in obj.__qualname__:
+        raise TypeError(
+            "{} must be defined at the top level of a module".format(obj.__qualname__)
+        )
+    return "{}:{}".format(obj.__module__, obj.__qualname__)
+
+
+def import_object(name: str) -> Any:
+    """Imports a class or function from its import name
+
+    Args:
+        name (str): The name returned by `object_import_name`
+
+    Returns:
+        Any: The class or function
+    """
+    module_name, qualname = name.split(":")
+    obj = importlib.import_module(module_name)
+    for attr in qualname.split("."):
+        obj = getattr(obj, attr)
+    return obj
+
+
+class NodeStaleness(NamedTuple):
+    "The staleness of a node, see FeatureDAG.staleness_report"
+
+    name: str
+    node_id: str
+    index: int
+    current_cache_tag: str
+    state_cache_tag: Optional[str]
+    is_stale: bool
+    is_upstream_stale: bool
+
+
+class StalenessReport:
+    # Fill colours used in the diagram
+    stale_color = "tomato"
+    upstream_stale_color = "orange"
+    fresh_color = "palegreen"
+
+    def __init__(self, dag: FeatureDAG, nodes: List[NodeStaleness]):
+        """StalenessReport constructor
+
+        Args:
+            dag (FeatureDAG): The DAG that was checked
+            nodes (List[NodeStaleness]): The staleness of each checked node
+        """
+        self._dag = dag
+        self.nodes = nodes
+
+    @property
+    def stale(self) -> List[NodeStaleness]:
+        """The nodes whose cache tag has changed since they last ran
+
+        Returns:
+            List[NodeStaleness]: The stale nodes
+        """
+        return [n for n in self.nodes if n.is_stale]
+
+    @property
+    def fresh(self) -> List[NodeStaleness]:
+        """The nodes whose cache tag is unchanged since they last ran
+
+        Note, a fresh node may still run if one of its ancestors is stale.
+
+        Returns:
+            List[NodeStaleness]: The fresh nodes
+        """
+        return [n for n in self.nodes if not n.is_stale]
+
+    def _repr_png_(self) -> bytes:
+        """Renders the DAG with stale, upstream stale and fresh nodes coloured
+
+        Returns:
+            bytes: The diagram as a png image
+        """
+
+        node_dot_attr = {}
+        for n in self.nodes:
+            if n.is_stale:
+                color = self.stale_color
+            elif n.is_upstream_stale:
+                color = self.upstream_stale_color
+            else:
+                color = self.fresh_color
+            node_dot_attr[n.node_id] = {"style": "filled", "fillcolor": color}
+
+        return self._dag._repr_png_(node_dot_attr=node_dot_attr)
+
+
+def _file_md5(path: str) -> str:
+    """Returns the md5 hash of a file's contents
+
+    Args:
+        path (str): The path of the file
+
+    Returns:
+        str: The hex md5 hash of the file
+    """
+
+    file_hash = md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+class JobPoller:
+    """Tracks asynchronously submitted jobs and collectively polls for their completion
+
+    Subclasses implement `_fetch_done_keys` to check the state of every tracked job
+    with as few calls as possible. The poll interval adapts, starting at
+    `min_interval` and growing by `backoff` each time a poll finds no completed jobs,
+    up to `max_interval`. It resets whenever a job completes or a new job is added.
+    """
+
+    min_interval = 0.5
+    max_interval = 10.0
+    backoff = 1.5
+
+    def __init__(self):
+        self._jobs = {}
+        self._interval = self.min_interval
+        self.next_poll_at = time.monotonic()
+        self.failed = []
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def add(self, job: Any, node: "FeatureNode") -> None:
+        """Starts tracking a submitted job
+
+        Args:
+            job (Any): The submitted job
+            node (FeatureNode): The node that submitted the job
+        """
+        self._jobs[self._job_key(job)] = (job, node)
+        self._interval = self.min_interval
+        self.next_poll_at = min(self.next_poll_at, time.monotonic() + self._interval)
+
+    def poll(self) -> List[Tuple[Any, "FeatureNode"]]:
+        """Checks all tracked jobs and returns those which have completed
+
+        Returns:
+            List[Tuple[Any, FeatureNode]]: The completed jobs and their nodes
+        """
+        completed = [self._jobs.pop(key) for key in self._fetch_done_keys()]
+
+        if completed:
+            self._interval = self.min_interval
+        else:
+            self._interval = min(self._interval * self.backoff, self.max_interval)
+        self.next_poll_at = time.monotonic() + self._interval
+
+        return completed
+
+    def cancel_all(self) -> None:
+        "Cancels every tracked job and stops tracking them"
+
+        for job, node in self._jobs.values():
+            try:
+                self._cancel_job(job)
+            except Exception as e:
+                logger.warning(
+                    "Failed to cancel a job of node {}: {}".format(node.name, e)
+                )
+        self._jobs = {}
+
+    def _cancel_job(self, job: Any) -> None:
+        """Requests a submitted job be cancelled
+
+        This function should be overridden by a subclass whose jobs can be
+        cancelled.
+
+        Args:
+            job (Any): The job
+        """
+
+    def _pop_failed(self, key: Any) -> Tuple[Any, "FeatureNode"]:
+        """Stops tracking a job that failed and records it in `failed`
+
+        Args:
+            key (Any): The key of the failed job
+
+        Returns:
+            Tuple[Any, FeatureNode]: The failed job and its node
+        """
+        job, node = self._jobs.pop(key)
+        self.failed.append((job, node))
+        return job, node
+
+    def _job_key(self, job: Any) -> Any:
+        """Returns a hashable key that uniquely identifies a job
+
+        Args:
+            job (Any): The job
+
+        Returns:
+            Any: The job's key
+        """
+        return job
+
+    def _fetch_done_keys(self) -> List[Any]:
+        """Returns the keys of the tracked jobs that have completed
+
+        This function should be overridden by a subclass.
+
+        Returns:
+            List[Any]: The keys of the completed jobs
+        """
+        raise NotImplementedError
 
 
 class FeatureNode:
+    # Nodes don't have a per instance __dict__ to keep very large DAGs small.
+    # Subclasses should declare __slots__ for any attributes they add.
+    __slots__ = ("_name", "_node_id", "_index", "_dag")
+
+    _job_poller_class = None
+    # The number of seconds the node's submitted jobs may run for, or None
+    _timeout = None
+
     def __init__(self, name: str):
         """FeatureNode constructor
 
@@ -248,9 +1164,7 @@ class FeatureNode:
         """
 
         self._name = name.strip()
-        self._node_id = md5(self._name.lower().encode("utf-8")).hexdigest()
-        self._parents = set()
-        self._children = set()
+        self._index = None
 
         self._dag = get_dag()
         if self._dag is None:
@@ -273,7 +1187,7 @@ class FeatureNode:
         Returns:
             Set[FeatureNode]: The set of nodes which are direct parents of the node
         """
-        return self._parents
+        return {self._dag._nodes[i] for i in self._dag._parent_indices(self._index)}
 
     @property
     def children(self) -> Set["FeatureNode"]:
@@ -282,7 +1196,7 @@ class FeatureNode:
         Returns:
             Set[FeatureNode]: The set of nodes which are direct children of the node
         """
-        return self._children
+        return {self._dag._nodes[i] for i in self._dag._child_indices(self._index)}
 
     @property
     def node_id(self) -> str:
@@ -298,6 +1212,15 @@ class FeatureNode:
         """
         return self._node_id
 
+    @property
+    def _dot_label(self) -> str:
+        """The label of the node in the DAG diagram
+
+        Returns:
+            str: The node's label
+        """
+        return self._name
+
     @property
     def is_node_stale(self) -> bool:
         """Used to check if the node needs to be run
@@ -359,6 +1282,74 @@ class FeatureNode:
         """
         pass
 
+    def _submit(self) -> Optional[List[Any]]:
+        """Starts the node running
+
+        By default the node is run synchronously. Subclasses that can run
+        asynchronously should override this to submit their work and return the
+        submitted jobs, which are then tracked by an instance of `_job_poller_class`.
+
+        Returns:
+            Optional[List[Any]]: The submitted jobs, or None if the node has already
+            finished running
+        """
+        self.run()
+        return None
+
+    def _on_job_done(self, job: Any) -> List[Any]:
+        """Called by the DAG when one of the node's submitted jobs completes
+
+        Args:
+            job (Any): The job that completed
+
+        Returns:
+            List[Any]: Any follow up jobs the node has submitted. The node is complete
+            once all its jobs, including follow up jobs, have completed.
+        """
+        return []
+
+    def _compiled_record(self) -> dict:
+        """Returns the node's metadata to save in a compiled DAG
+
+        Subclasses should extend this with whatever `_load_compiled` needs to
+        restore the node without calling its constructor. The values must be JSON
+        serializable.
+
+        Returns:
+            dict: The node's metadata
+        """
+        return {}
+
+    def _load_compiled(self, record: dict) -> None:
+        """Restores the node from the metadata saved in a compiled DAG
+
+        Args:
+            record (dict): The metadata returned by `_compiled_record`
+        """
+        pass
+
+    def _table_lineage(self) -> Tuple[List[str], List[str]]:
+        """Returns the tables the node reads from and writes to
+
+        Used by `FeatureDAG.infer_edges` to connect nodes. Nodes that don't know
+        their tables return empty lists.
+
+        Returns:
+            Tuple[List[str], List[str]]: The names of the tables the node reads from and
+            the tables it writes to
+        """
+        return [], []
+
+    def _compiled_sources(self) -> List[str]:
+        """Returns the files the node was built from
+
+        A compiled DAG is invalidated when any of these files change.
+
+        Returns:
+            List[str]: The paths of the node's source files
+        """
+        return []
+
     def _update_cache(self, new_tag: str) -> None:
         """Updates the cache tag in the state database
 
@@ -392,18 +1383,15 @@ class FeatureNode:
 
         for node in other:
 
-            if node in self._children:
+            if self._index in self._dag._parent_indices(node._index):
                 raise ValueError("Node {} already a child".format(node.name))
 
-            if node.node_id == self._node_id:
+            if node is self:
                 raise ValueError("Node can not be connected to itself")
 
-            if self._dag._is_node_parent(node=self, check_node_id=node.node_id):
+            if self._dag._is_node_ancestor(node=self, check_node=node):
                 raise ValueError("Node can not be connected to a parent node")
 
-            self._children.add(node)
-            node._parents.add(self)
-
             self._dag._connect_node(parent_node=self, child_node=node)
 
         return other
@@ -429,18 +1417,18 @@ class FeatureNode:
 
         for node in other:
 
-            if node.node_id == self._node_id:
+            if node is self:
                 raise ValueError("Node can not be connected to itself")
 
-            if self._dag._is_node_child(node=self, check_node_id=node.node_id):
+            if self._dag._is_node_descendant(node=self, check_node=node):
                 raise ValueError(
                     "Node {}, can not be connected to child node {}".format(
                         self.name, node.name
                     )
                 )
 
-            self._parents.add(node)
-            node._children.add(self)
+            if node._index in self._dag._parent_indices(self._index):
+                continue
 
             self._dag._connect_node(parent_node=node, child_node=self)
 
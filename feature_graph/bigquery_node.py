@@ -1,12 +1,169 @@
-from feature_graph.base import FeatureNode
+from feature_graph.base import FeatureNode, JobPoller
+from feature_graph.query_node import QueryNode
+from google.api_core.exceptions import Conflict, NotFound
 from google.cloud import bigquery
 from loguru import logger
-import os
-from typing import Set
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Set, Tuple
 import hashlib
+import itertools
+import json
 
 
-class BigQueryNode(FeatureNode):
+class BigQueryJobPoller(JobPoller):
+    """Tracks submitted BigQuery jobs with a single bulk poller
+
+    Rather than polling each job individually, the poller lists the completed jobs in
+    each project once per poll, limited to jobs created since the earliest tracked job
+    was submitted. Only the first `list_page_size` completed jobs are listed. In a
+    busy project, where other workloads' jobs fill that page, any tracked jobs not
+    found on it are checked individually instead of paging through the listing.
+    """
+
+    # Allow for clock skew between the local machine and BigQuery
+    creation_time_margin = timedelta(minutes=5)
+    list_page_size = 100
+
+    def __init__(self):
+        super().__init__()
+        self._min_creation_time = {}
+
+    def add(self, job: bigquery.QueryJob, node: FeatureNode) -> None:
+        """Starts tracking a submitted query job
+
+        Args:
+            job (bigquery.QueryJob): The submitted job
+            node (FeatureNode): The node that submitted the job
+        """
+        super().add(job, node)
+
+        group = (id(node.client), job.project)
+        # Jobs reattached to after a restart may have been created long ago
+        created = job.created if isinstance(job.created, datetime) else None
+        submitted = (created or datetime.now(timezone.utc)) - self.creation_time_margin
+        if group not in self._min_creation_time:
+            self._min_creation_time[group] = submitted
+        self._min_creation_time[group] = min(self._min_creation_time[group], submitted)
+
+    def _job_key(self, job: bigquery.QueryJob) -> Tuple[str, str]:
+        """Returns the project and ID of a job, which uniquely identify it
+
+        Args:
+            job (bigquery.QueryJob): The job
+
+        Returns:
+            Tuple[str, str]: The job's project and job ID
+        """
+        return (job.project, job.job_id)
+
+    def _fetch_done_keys(self) -> List[Tuple[str, str]]:
+        """Lists the completed jobs in each project containing tracked jobs
+
+        Raises:
+            google.api_core.exceptions.GoogleAPICallError: If a tracked job failed
+
+        Returns:
+            List[Tuple[str, str]]: The keys of the tracked jobs that have completed
+        """
+
+        groups = {}
+        for key, (job, node) in self._jobs.items():
+            group = (id(node.client), job.project)
+            if group not in groups:
+                groups[group] = (node.client, set())
+            groups[group][1].add(key)
+
+        done_keys = []
+        for group, (client, keys) in groups.items():
+            project = group[1]
+            n_listed = 0
+            for listed_job in client.list_jobs(
+                project=project,
+                state_filter="done",
+                min_creation_time=self._min_creation_time[group],
+                max_results=self.list_page_size,
+            ):
+                n_listed += 1
+                key = (project, listed_job.job_id)
+                if key not in keys:
+                    continue
+                self._check_job_error(key, listed_job)
+                keys.remove(key)
+                done_keys.append(key)
+                if not keys:
+                    break
+
+            if keys and n_listed >= self.list_page_size:
+                # The listing was truncated so check the remaining jobs individually
+                for key in list(keys):
+                    fetched_job = client.get_job(key[1], project=project)
+                    if fetched_job.state != "DONE":
+                        continue
+                    self._check_job_error(key, fetched_job)
+                    keys.remove(key)
+                    done_keys.append(key)
+
+            if not keys:
+                del self._min_creation_time[group]
+
+        return done_keys
+
+    def _check_job_error(
+        self, key: Tuple[str, str], done_job: bigquery.QueryJob
+    ) -> None:
+        """Raises the job's exception if a completed job failed
+
+        Args:
+            key (Tuple[str, str]): The key of the tracked job
+            done_job (bigquery.QueryJob): The completed job, as listed or fetched
+
+        Raises:
+            google.api_core.exceptions.GoogleAPICallError: If the job failed
+        """
+        if done_job.error_result:
+            job, _ = self._pop_failed(key)
+            # Fetch the job's result to raise the same exception as a blocking call
+            # would
+            job.result()
+
+    def _cancel_job(self, job: bigquery.QueryJob) -> None:
+        """Requests a submitted job be cancelled
+
+        Args:
+            job (bigquery.QueryJob): The job
+        """
+        logger.info("Cancelling job {}".format(job.job_id))
+        job.cancel()
+
+
+def full_table_name(table: str, default_project: str) -> str:
+    """Returns the fully qualified name of a BigQuery table
+
+    Args:
+        table (str): The table name, either "dataset.table" or "project.dataset.table"
+        default_project (str): The project of the table if it isn't in the name
+
+    Returns:
+        str: The table name as "project.dataset.table"
+    """
+    tbl_ref = bigquery.table.TableReference.from_string(
+        table, default_project=default_project
+    )
+    return "{}.{}.{}".format(tbl_ref.project, tbl_ref.dataset_id, tbl_ref.table_id)
+
+
+class BigQueryNode(QueryNode):
+    __slots__ = (
+        "_project",
+        "_client",
+        "_infer_input_tables",
+        "_timeout",
+        "_current_cache_tag",
+    )
+
+    _job_poller_class = BigQueryJobPoller
+
     def __init__(
         self,
         name: str,
@@ -16,28 +173,41 @@ class BigQueryNode(FeatureNode):
         query_params: dict = None,
         input_tables: Set[str] = None,
         client: bigquery.Client = None,
+        infer_input_tables: bool = None,
+        timeout: float = None,
     ):
-        super().__init__(name=name)
-
-        if query and query_file:
-            raise ValueError("You can not specify both query and query_file")
-        if not query and not query_file:
-            raise ValueError("You must specify either query or query file")
+        """BigQueryNode constructor
 
-        if query:
-            query_str = query
+        Args:
+            name (str): The name of the node. Note, it must be a unique in a DAG
+            query (str, optional): The query to run. Defaults to None.
+            query_file (str, optional): The path of a file containing the query to run.
+            Defaults to None.
+            project (str, optional): The project to run the query in. If not supplied
+            then it is taken from the "project" DAG parameter. Defaults to None.
+            query_params (dict, optional): Parameters substituted into the query with
+            `str.format`. Defaults to None.
+            input_tables (Set[str], optional): The tables the query reads from. They
+            are used to check if the node needs rerunning. Defaults to None.
+            client (bigquery.Client, optional): The BigQuery client. If not supplied
+            then one is created when it is first needed. Defaults to None.
+            infer_input_tables (bool, optional): If input_tables isn't supplied, find
+            the tables the query reads from with a dry run and use them to check if
+            the node needs rerunning. If not supplied then it is taken from the
+            "infer_input_tables" DAG parameter, or False. Defaults to None.
+            timeout (float, optional): The maximum number of seconds the node's
+            queries may run for before they are cancelled. Defaults to None.
 
-        if query_file:
-            if not os.path.exists(query_file):
-                raise FileNotFoundError(
-                    "The query_file {} is not found".format(query_file)
-                )
-            with open(query_file, "r") as f:
-                query_str = f.read()
-
-        self._query = query_str
-        if query_params:
-            self._query = query_str.format(**query_params)
+        Raises:
+            LookupError: If the project isn't specified or in the DAG parameters
+        """
+        super().__init__(
+            name=name,
+            query=query,
+            query_file=query_file,
+            query_params=query_params,
+            input_tables=input_tables,
+        )
 
         self._project = project
         if not self._project:
@@ -48,12 +218,13 @@ class BigQueryNode(FeatureNode):
             self._project = self._dag.dag_params["project"]
 
         self._client = client
-        if not self._client:
-            self._client = bigquery.Client()
 
-        if input_tables and not isinstance(input_tables, list):
-            input_tables = [input_tables]
-        self._input_tables = input_tables
+        if infer_input_tables is None:
+            dag_params = self._dag.dag_params or {}
+            infer_input_tables = dag_params.get("infer_input_tables", False)
+        self._infer_input_tables = infer_input_tables
+        self._timeout = timeout
+        self._current_cache_tag = None
 
     @property
     def project(self) -> str:
@@ -64,12 +235,154 @@ class BigQueryNode(FeatureNode):
         """
         return self._project
 
+    @property
+    def client(self) -> bigquery.Client:
+        """Returns the BigQuery client used by the node
+
+        If a client wasn't given to the constructor then one is created the first
+        time it is needed.
+
+        Returns:
+            bigquery.Client: The BigQuery client
+        """
+        if not self._client:
+            self._client = bigquery.Client()
+        return self._client
+
     def run(self) -> None:
-        "Runs the query on BigQuery"
+        """Runs the query on BigQuery
+
+        Raises:
+            TimeoutError: If the query doesn't finish within the node's timeout
+        """
+
+        self._wait(self._start_query(self._query, self._job_id(self._cache_tag())))
 
-        logger.debug("Query: {}".format(self._query))
+    def _submit(self) -> List[bigquery.QueryJob]:
+        """Submits the query to BigQuery without waiting for it to finish
 
-        _ = self._client.query(self._query, project=self._project).result()
+        Returns:
+            List[bigquery.QueryJob]: The submitted query job
+        """
+        return [self._start_query(self._query, self._job_id(self._cache_tag()))]
+
+    def _cache_tag(self) -> str:
+        """Returns the cache tag last calculated by `_calc_current_cache_tag`
+
+        The scheduler calculates the tag just before submitting a stale node, so it
+        is reused rather than looking up the input tables again.
+
+        Returns:
+            str: The node's current cache tag
+        """
+        if self._current_cache_tag is None:
+            self._calc_current_cache_tag()
+        return self._current_cache_tag
+
+    def _job_id(self, cache_tag: str, shard: str = "") -> str:
+        """Returns the deterministic ID of the job that runs the node's query
+
+        The ID is derived from the node ID, the cache tag and the start time of the
+        node's last recorded run. If the process dies while a job is running, no
+        run is recorded, so the next run derives the same ID and reattaches to the
+        job. Once a run is recorded, successful or not, later runs get new IDs.
+
+        Args:
+            cache_tag (str): The cache tag the job is run for
+            shard (str, optional): Identifies the shard of a node that runs several
+            queries. Defaults to "".
+
+        Returns:
+            str: The job ID
+        """
+        last_run = self._dag._runs_dict.get(self.node_id, None)
+        last_started = last_run["started"] if last_run else ""
+        digest = hashlib.md5(
+            "|".join([cache_tag, last_started, shard]).encode("utf-8")
+        ).hexdigest()
+        return "feature_graph_{}_{}".format(self.node_id, digest)
+
+    def _start_query(self, query: str, job_id: str = None) -> bigquery.QueryJob:
+        """Starts a query job on BigQuery, or reattaches to the job with the same ID
+
+        If a job with the ID already exists and is running or succeeded it is
+        returned instead of running the query again. If it failed or was cancelled
+        the query is retried with an attempt number appended to the ID.
+
+        Args:
+            query (str): The query to run
+            job_id (str, optional): The ID of the job. If not supplied then BigQuery
+            generates a random ID. Defaults to None.
+
+        Returns:
+            bigquery.QueryJob: The started or existing job
+        """
+
+        logger.debug("Query: {}".format(query))
+
+        if job_id is None:
+            return self.client.query(query, project=self._project)
+
+        for attempt in itertools.count():
+            attempt_job_id = job_id if attempt == 0 else "{}_{}".format(job_id, attempt)
+            try:
+                return self.client.query(
+                    query, project=self._project, job_id=attempt_job_id
+                )
+            except Conflict:
+                job = self.client.get_job(attempt_job_id, project=self._project)
+                if job.state == "DONE" and job.error_result:
+                    logger.info(
+                        "Job {} failed or was cancelled, retrying".format(
+                            attempt_job_id
+                        )
+                    )
+                    continue
+                logger.info("Reattaching to job {}".format(attempt_job_id))
+                return job
+
+    def _wait(self, job: bigquery.QueryJob) -> None:
+        """Waits for a query job to finish, cancelling it if the wait fails, times
+        out or is interrupted
+
+        Args:
+            job (bigquery.QueryJob): The job
+
+        Raises:
+            TimeoutError: If the job doesn't finish within the node's timeout
+        """
+        try:
+            job.result(timeout=self._timeout)
+        except BaseException:
+            if job.state != "DONE":
+                logger.info("Cancelling job {}".format(job.job_id))
+                job.cancel()
+            raise
+
+    def _compiled_record(self) -> dict:
+        """Returns the node's metadata to save in a compiled DAG
+
+        Returns:
+            dict: The rendered query, its hash and the node's settings
+        """
+        record = super()._compiled_record()
+        record["project"] = self._project
+        record["timeout"] = self._timeout
+        record["infer_input_tables"] = self._infer_input_tables
+        return record
+
+    def _load_compiled(self, record: dict) -> None:
+        """Restores the node from the metadata saved in a compiled DAG
+
+        Args:
+            record (dict): The metadata returned by `_compiled_record`
+        """
+        super()._load_compiled(record)
+        self._project = record["project"]
+        self._client = None
+        self._infer_input_tables = record["infer_input_tables"]
+        self._timeout = record["timeout"]
+        self._current_cache_tag = None
 
     def _calc_current_cache_tag(self) -> str:
         """Used to check if the node needs to be run
@@ -82,7 +395,8 @@ class BigQueryNode(FeatureNode):
         hashing it. The string is composed of,
 
         1) The query with the query_params substituted in
-        2) If input tables used by the query are provided it will then,
+        2) If input tables used by the query are provided, or inferred with a dry run,
+           it will then,
            a) Get the full table names of the input_tables, including the project
            b) Get the last modified timestamp of each table
            c) Sort the list of full table names to add determinism
@@ -94,23 +408,39 @@ class BigQueryNode(FeatureNode):
             the node change
 
         """
-        str_to_hash = self._query
+        str_to_hash = self._query + self._input_tables_state()
 
-        if self._input_tables:
+        cache_tag = hashlib.md5(str_to_hash.encode("utf-8")).hexdigest()
+        self._current_cache_tag = cache_tag
+
+        return cache_tag
+
+    def _input_tables_state(self) -> str:
+        """Returns a string describing the state of the node's input tables
+
+        Returns:
+            str: The input tables' names and last modified timestamps, or an empty
+            string if the node has no input tables
+        """
+        str_to_hash = ""
+        input_tables = self._cache_tag_input_tables()
+
+        if input_tables:
 
             table_data_list = []
-            for tbl in self._input_tables:
+            for tbl in input_tables:
 
                 tbl_ref = bigquery.table.TableReference.from_string(
                     tbl, default_project=self._project
                 )
-                table = self._client.get_table(tbl_ref)
+                table = self.client.get_table(tbl_ref)
 
                 table_data_list.append(
                     {
                         "full_table_name": "{}.{}.{}".format(
                             table.project, table.dataset_id, table.table_id
                         ),
+                        "table_id": table.table_id,
                         "last_modified": str(table.modified),
                     }
                 )
@@ -122,11 +452,380 @@ class BigQueryNode(FeatureNode):
 
             str_to_hash += "|".join(
                 [
-                    "{}_{}".format(table.table_id, table.modified)
+                    "{}_{}".format(t["table_id"], t["last_modified"])
                     for t in table_data_list
                 ]
             )
 
-        cache_tag = hashlib.md5(str_to_hash.encode("utf-8")).hexdigest()
+        return str_to_hash
 
-        return cache_tag
+    def _cache_tag_input_tables(self) -> Optional[List[str]]:
+        """Returns the input tables used to check if the node needs rerunning
+
+        Returns:
+            Optional[List[str]]: The declared input tables or, if there are none and
+            inference is enabled, the tables the query reads from
+        """
+        if self._input_tables or not self._infer_input_tables:
+            return self._input_tables
+        return self._table_lineage()[0]
+
+    def _queries(self) -> List[str]:
+        """Returns the queries the node runs
+
+        Returns:
+            List[str]: The node's query
+        """
+        return [self._query]
+
+    def dry_run_tables(self, query: str) -> Tuple[List[str], List[str]]:
+        """Finds the tables a query reads from and writes to with a dry run
+
+        Dry runs are free and only validate the query. The result is cached in the
+        "dry_run" table of the state database by the hash of the project and query,
+        so each query is only dry run once.
+
+        Args:
+            query (str): The query
+
+        Raises:
+            google.api_core.exceptions.GoogleAPICallError: If the dry run fails, eg
+            because a table the query reads from doesn't exist
+
+        Returns:
+            Tuple[List[str], List[str]]: The fully qualified names of the tables the
+            query reads from and the tables it writes to
+        """
+
+        dry_runs = self._dag._state_table("dry_run")
+        key = hashlib.md5(
+            "{}|{}".format(self._project, query).encode("utf-8")
+        ).hexdigest()
+
+        if key not in dry_runs:
+            job = self.client.query(
+                query,
+                project=self._project,
+                job_config=bigquery.QueryJobConfig(dry_run=True, use_query_cache=False),
+            )
+            # Queries without a destination write to a table in a hidden, anonymous
+            # dataset, which is ignored
+            destinations = {
+                "{}.{}.{}".format(t.project, t.dataset_id, t.table_id)
+                for t in [job.ddl_target_table, job.destination]
+                if t is not None and not t.dataset_id.startswith("_")
+            }
+            referenced = {
+                "{}.{}.{}".format(t.project, t.dataset_id, t.table_id)
+                for t in job.referenced_tables or []
+            }
+            dry_runs[key] = {
+                "referenced": sorted(referenced - destinations),
+                "destinations": sorted(destinations),
+            }
+
+        cached = dry_runs[key]
+        return cached["referenced"], cached["destinations"]
+
+    def _table_lineage(self) -> Tuple[List[str], List[str]]:
+        """Returns the tables the node reads from and writes to
+
+        The tables are found by dry running the node's queries, plus any declared
+        input tables. If a dry run fails because a table doesn't exist yet, eg it is
+        created by another node which hasn't run, only the declared input tables are
+        returned for that query and the failure isn't cached.
+
+        Returns:
+            Tuple[List[str], List[str]]: The fully qualified names of the tables the
+            node reads from and the tables it writes to
+        """
+
+        consumed = {full_table_name(t, self._project) for t in self._input_tables or []}
+        produced = set()
+        for query in self._queries():
+            try:
+                referenced, destinations = self.dry_run_tables(query)
+            except NotFound as e:
+                logger.warning(
+                    "Dry run of node {} failed, declare its input_tables or run the "
+                    "nodes that create its tables first: {}".format(self.name, e)
+                )
+                continue
+            consumed.update(referenced)
+            produced.update(destinations)
+
+        return sorted(consumed - produced), sorted(produced)
+
+
+class BigQueryMapNode(BigQueryNode):
+    __slots__ = (
+        "_query_params",
+        "_param_list",
+        "_max_concurrency",
+        "_shard_tags",
+        "_pending_shards",
+        "_running_shards",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        param_list: List[dict],
+        query: str = None,
+        query_file: str = None,
+        project: str = None,
+        query_params: dict = None,
+        input_tables: Set[str] = None,
+        client: bigquery.Client = None,
+        max_concurrency: int = 10,
+        infer_input_tables: bool = None,
+        timeout: float = None,
+    ):
+        """BigQueryMapNode constructor
+
+        A single node in the DAG that runs the same query template once for each set
+        of parameters in param_list, eg once per country or per date in a backfill.
+        Each of these shards has its own cache tag in the state, so only the shards
+        whose query or input tables changed are rerun, and at most max_concurrency
+        shards run at once.
+
+        Args:
+            name (str): The name of the node. Note, it must be a unique in a DAG
+            param_list (List[dict]): The parameters of each shard. Each is combined
+            with query_params and substituted into the query with `str.format`
+            query (str, optional): The query template. Defaults to None.
+            query_file (str, optional): The path of a file containing the query
+            template. Defaults to None.
+            project (str, optional): The project to run the queries in. Defaults to the
+            "project" DAG parameter.
+            query_params (dict, optional): Parameters shared by every shard. Defaults
+            to None.
+            input_tables (Set[str], optional): The tables the queries read from.
+            Defaults to None.
+            client (bigquery.Client, optional): The BigQuery client. Defaults to None.
+            max_concurrency (int, optional): The maximum number of shards to run at
+            once. Defaults to 10.
+            infer_input_tables (bool, optional): If input_tables isn't supplied, find
+            the tables the shards read from with dry runs. Defaults to the
+            "infer_input_tables" DAG parameter, or False.
+            timeout (float, optional): The maximum number of seconds the node's
+            shards may run for before they are cancelled. When the node is run on its
+            own with `run` it applies to each shard. Defaults to None.
+
+        Raises:
+            ValueError: If param_list is empty
+        """
+        super().__init__(
+            name=name,
+            query=query,
+            query_file=query_file,
+            project=project,
+            input_tables=input_tables,
+            client=client,
+            infer_input_tables=infer_input_tables,
+            timeout=timeout,
+        )
+
+        if not param_list:
+            raise ValueError("param_list must contain at least one set of parameters")
+
+        self._query_params = query_params or {}
+        self._param_list = param_list
+        self._max_concurrency = max_concurrency
+        self._shard_tags = None
+        self._pending_shards = deque()
+        self._running_shards = {}
+
+    @property
+    def n_shards(self) -> int:
+        """Returns the number of shards
+
+        Returns:
+            int: The number of shards
+        """
+        return len(self._param_list)
+
+    @property
+    def _dot_label(self) -> str:
+        return "{} [{} shards]".format(self._name, self.n_shards)
+
+    def shard_query(self, shard: int) -> str:
+        """Returns the query of a shard with its parameters substituted in
+
+        Args:
+            shard (int): The index of the shard in param_list
+
+        Returns:
+            str: The shard's query
+        """
+        return self._query.format(**self._query_params, **self._param_list[shard])
+
+    def _queries(self) -> List[str]:
+        """Returns the queries the node runs
+
+        Returns:
+            List[str]: The query of each shard
+        """
+        return [self.shard_query(shard) for shard in range(self.n_shards)]
+
+    def _shard_state_key(self, shard: int) -> str:
+        """Returns the key of a shard's cache tag in the DAG's state
+
+        Args:
+            shard (int): The index of the shard in param_list
+
+        Returns:
+            str: The state key, which is unique to the shard's parameters
+        """
+        params = json.dumps(self._param_list[shard], sort_keys=True, default=str)
+        return "{}/{}".format(
+            self.node_id, hashlib.md5(params.encode("utf-8")).hexdigest()
+        )
+
+    def _calc_shard_cache_tags(self) -> List[str]:
+        """Calculates the current cache tag of every shard
+
+        The input tables are only looked up once and shared by all shards. When they
+        are inferred with dry runs they are the tables read by any shard.
+
+        Returns:
+            List[str]: The cache tag of each shard
+        """
+        input_tables_state = self._input_tables_state()
+        return [
+            hashlib.md5(
+                (self.shard_query(shard) + input_tables_state).encode("utf-8")
+            ).hexdigest()
+            for shard in range(self.n_shards)
+        ]
+
+    def _calc_current_cache_tag(self) -> str:
+        """Used to check if the node needs to be run
+
+        Returns:
+            str: The md5 hash of the cache tags of every shard
+        """
+        self._shard_tags = self._calc_shard_cache_tags()
+        return hashlib.md5("|".join(self._shard_tags).encode("utf-8")).hexdigest()
+
+    def _stale_shards(self) -> List[int]:
+        """Returns the shards whose cache tag has changed since they last ran
+
+        Returns:
+            List[int]: The indices of the stale shards
+        """
+        if self._shard_tags is None:
+            self._shard_tags = self._calc_shard_cache_tags()
+
+        state = self._dag._state_dict
+        return [
+            shard
+            for shard, cache_tag in enumerate(self._shard_tags)
+            if state.get(self._shard_state_key(shard), None) != cache_tag
+        ]
+
+    def run(self) -> None:
+        "Runs the stale shards one after another"
+
+        for shard in self._stale_shards():
+            self._wait(self._start_shard_query(shard))
+            self._dag._state_dict[self._shard_state_key(shard)] = self._shard_tags[
+                shard
+            ]
+        self._shard_tags = None
+
+    def _submit(self) -> List[bigquery.QueryJob]:
+        """Submits the first max_concurrency stale shards
+
+        Returns:
+            List[bigquery.QueryJob]: The submitted query jobs
+        """
+        self._pending_shards = deque(self._stale_shards())
+        self._running_shards = {}
+        return [self._start_next_shard() for _ in range(self._initial_shards())]
+
+    def _initial_shards(self) -> int:
+        """Returns the number of shards to submit at first
+
+        Returns:
+            int: The number of shards
+        """
+        return min(self._max_concurrency, len(self._pending_shards))
+
+    def _start_next_shard(self) -> bigquery.QueryJob:
+        """Submits the next pending shard
+
+        Returns:
+            bigquery.QueryJob: The submitted query job
+        """
+        shard = self._pending_shards.popleft()
+        job = self._start_shard_query(shard)
+        self._running_shards[(job.project, job.job_id)] = shard
+        return job
+
+    def _start_shard_query(self, shard: int) -> bigquery.QueryJob:
+        """Starts a shard's query job, or reattaches to it
+
+        Args:
+            shard (int): The index of the shard in param_list
+
+        Returns:
+            bigquery.QueryJob: The started or existing job
+        """
+        job_id = self._job_id(
+            self._shard_tags[shard], shard=self._shard_state_key(shard)
+        )
+        return self._start_query(self.shard_query(shard), job_id)
+
+    def _on_job_done(self, job: bigquery.QueryJob) -> List[bigquery.QueryJob]:
+        """Records the finished shard's cache tag and submits the next pending shard
+
+        Args:
+            job (bigquery.QueryJob): The finished shard's job
+
+        Returns:
+            List[bigquery.QueryJob]: The next shard's job, if any shards are pending
+        """
+        shard = self._running_shards.pop((job.project, job.job_id))
+        self._dag._state_dict[self._shard_state_key(shard)] = self._shard_tags[shard]
+
+        if self._pending_shards:
+            return [self._start_next_shard()]
+        if not self._running_shards:
+            self._shard_tags = None
+        return []
+
+    def clear_state(self) -> None:
+        "Clears the cache tags of the node and all its shards from the DAG's state"
+
+        super().clear_state()
+        for shard in range(self.n_shards):
+            key = self._shard_state_key(shard)
+            if key in self._dag._state_dict:
+                del self._dag._state_dict[key]
+
+    def _compiled_record(self) -> dict:
+        """Returns the node's metadata to save in a compiled DAG
+
+        Returns:
+            dict: The query template, parameters and the node's settings
+        """
+        record = super()._compiled_record()
+        record["query_params"] = self._query_params
+        record["param_list"] = self._param_list
+        record["max_concurrency"] = self._max_concurrency
+        return record
+
+    def _load_compiled(self, record: dict) -> None:
+        """Restores the node from the metadata saved in a compiled DAG
+
+        Args:
+            record (dict): The metadata returned by `_compiled_record`
+        """
+        super()._load_compiled(record)
+        self._query_params = record["query_params"]
+        self._param_list = record["param_list"]
+        self._max_concurrency = record["max_concurrency"]
+        self._shard_tags = None
+        self._pending_shards = deque()
+        self._running_shards = {}
@@ -0,0 +1,228 @@
+"""The feature-graph command line interface
+
+Only the standard library is imported at module level so that commands which read the
+state database directly, such as `status`, start quickly and never construct
+BigQuery clients. Commands that need the DAG import it from a DAG module, a python
+file or module that creates a FeatureDAG.
+"""
+
+import argparse
+import importlib
+import importlib.util
+import json
+import os
+import sqlite3
+import sys
+from typing import List
+
+
+def load_dag(dag_module: str, dag_attr: str = None) -> "FeatureDAG":  # noqa: F821
+    """Imports a DAG module and returns the FeatureDAG it defines
+
+    Args:
+        dag_module (str): The path to a python file, or the dotted name of a module,
+        that creates a FeatureDAG
+        dag_attr (str, optional): The name of the module attribute holding the DAG. If
+        not supplied then the module must define exactly one FeatureDAG. Defaults to
+        None.
+
+    Raises:
+        LookupError: If the DAG can't be found in the module
+
+    Returns:
+        FeatureDAG: The DAG defined by the module
+    """
+    from feature_graph.base import FeatureDAG
+
+    if dag_module.endswith(".py") or os.path.exists(dag_module):
+        spec = importlib.util.spec_from_file_location("feature_graph_dag", dag_module)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    else:
+        module = importlib.import_module(dag_module)
+
+    if dag_attr:
+        dag = getattr(module, dag_attr, None)
+        if not isinstance(dag, FeatureDAG):
+            raise LookupError(
+                "{} is not a FeatureDAG in {}".format(dag_attr, dag_module)
+            )
+        return dag
+
+    dags = [v for v in vars(module).values() if isinstance(v, FeatureDAG)]
+    if len(dags) != 1:
+        raise LookupError(
+            "Expected one FeatureDAG in {} but found {}, use --dag-attr".format(
+                dag_module, len(dags)
+            )
+        )
+    return dags[0]
+
+
+def read_last_runs(state_db: str) -> List[dict]:
+    """Reads the record of each node's last run straight from the state database
+
+    Args:
+        state_db (str): The path of the sqlite state database
+
+    Raises:
+        FileNotFoundError: If the state database doesn't exist
+
+    Returns:
+        List[dict]: The last run of each node, most recently finished first
+    """
+
+    if not os.path.exists(state_db):
+        raise FileNotFoundError("The state_db {} is not found".format(state_db))
+
+    conn = sqlite3.connect("file:{}?mode=ro".format(state_db), uri=True)
+    try:
+        rows = conn.execute('SELECT value FROM "runs"').fetchall()
+    except sqlite3.OperationalError:
+        # The DAG has never run so the runs table hasn't been created
+        rows = []
+    finally:
+        conn.close()
+
+    runs = [json.loads(value) for (value,) in rows]
+    return sorted(runs, key=lambda r: r["finished"], reverse=True)
+
+
+def status(args: argparse.Namespace) -> None:
+    """Prints when each node last ran
+
+    Args:
+        args (argparse.Namespace): The parsed command line arguments
+    """
+
+    runs = read_last_runs(args.state_db)
+    if not runs:
+        print("No runs recorded in {}".format(args.state_db))
+        return
+
+    print("Last run finished {}".format(runs[0]["finished"]))
+    width = max(len(r["name"]) for r in runs)
+    for run in runs:
+        print(
+            "{:<{width}}  {:<9}  {}  {:>9.1f}s".format(
+                run["name"],
+                run["status"],
+                run["finished"],
+                run["duration"],
+                width=width,
+            )
+        )
+
+
+def plan(args: argparse.Namespace) -> None:
+    """Prints the nodes a run would consider and whether each is stale
+
+    Args:
+        args (argparse.Namespace): The parsed command line arguments
+    """
+
+    dag = load_dag(args.dag_module, args.dag_attr)
+    report = dag.staleness_report(max_workers=args.workers, targets=args.targets)
+    for node in report.nodes:
+        if node.is_stale:
+            state = "stale"
+        elif node.is_upstream_stale:
+            state = "upstream stale"
+        else:
+            state = "fresh"
+        print("{:<14}  {}".format(state, node.name))
+
+
+def run(args: argparse.Namespace) -> None:
+    """Runs the DAG
+
+    Args:
+        args (argparse.Namespace): The parsed command line arguments
+    """
+
+    dag = load_dag(args.dag_module, args.dag_attr)
+    dag.run_feature_graph(
+        max_jobs=args.jobs, targets=args.targets, timeout=args.timeout
+    )
+
+
+def compact(args: argparse.Namespace) -> None:
+    """Removes nodes that are no longer in the DAG from its state
+
+    Args:
+        args (argparse.Namespace): The parsed command line arguments
+    """
+
+    dag = load_dag(args.dag_module, args.dag_attr)
+    dag.compact_state()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Builds the command line argument parser
+
+    Returns:
+        argparse.ArgumentParser: The argument parser
+    """
+
+    parser = argparse.ArgumentParser(prog="feature-graph")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.required = True
+
+    status_parser = subparsers.add_parser(
+        "status", help="Show when each node last ran, read from the state database"
+    )
+    status_parser.add_argument("--state-db", required=True)
+    status_parser.set_defaults(func=status)
+
+    for name, func, help_text in [
+        ("plan", plan, "Show which nodes are stale"),
+        ("run", run, "Run the stale nodes in the DAG"),
+        ("compact", compact, "Remove nodes no longer in the DAG from its state"),
+    ]:
+        sub_parser = subparsers.add_parser(name, help=help_text)
+        sub_parser.add_argument(
+            "dag_module", help="A python file or module that creates a FeatureDAG"
+        )
+        sub_parser.add_argument(
+            "--dag-attr", help="The module attribute holding the FeatureDAG"
+        )
+        if name in ["plan", "run"]:
+            sub_parser.add_argument(
+                "--targets",
+                nargs="+",
+                help="Only include these nodes and their ancestors",
+            )
+        if name == "plan":
+            sub_parser.add_argument(
+                "--workers",
+                type=int,
+                default=8,
+                help="The number of threads used to check the nodes",
+            )
+        if name == "run":
+            sub_parser.add_argument(
+                "--jobs", type=int, help="The maximum number of nodes to run at once"
+            )
+            sub_parser.add_argument(
+                "--timeout",
+                type=float,
+                help="Cancel the run if it takes longer than this many seconds",
+            )
+        sub_parser.set_defaults(func=func)
+
+    return parser
+
+
+def main(argv: List[str] = None) -> None:
+    """The entry point of the feature-graph command
+
+    Args:
+        argv (List[str], optional): The command line arguments. Defaults to the
+        arguments the process was started with.
+    """
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
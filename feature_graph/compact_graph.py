@@ -0,0 +1,194 @@
+from array import array
+from collections import deque
+from typing import Iterable, List, Sequence
+
+
+def reachable(
+    n_nodes: int, sources: Iterable[int], neighbours: Sequence[Sequence[int]]
+) -> bytearray:
+    """Finds every node reachable from a set of source nodes
+
+    Args:
+        n_nodes (int): The number of nodes in the graph
+        sources (Iterable[int]): The indices of the nodes to start from
+        neighbours (Sequence[Sequence[int]]): For each node index, the indices of the
+        nodes it connects to
+
+    Returns:
+        bytearray: A mask with 1 for every node reachable from the sources, not
+        including the sources themselves unless they are reachable from another source
+    """
+
+    seen = bytearray(n_nodes)
+    stack = list(sources)
+    while stack:
+        for i in neighbours[stack.pop()]:
+            if not seen[i]:
+                seen[i] = 1
+                stack.append(i)
+    return seen
+
+
+def is_reachable(
+    n_nodes: int, source: int, target: int, neighbours: Sequence[Sequence[int]]
+) -> bool:
+    """Checks if a target node can be reached from a source node
+
+    Args:
+        n_nodes (int): The number of nodes in the graph
+        source (int): The index of the node to start from
+        target (int): The index of the node to look for
+        neighbours (Sequence[Sequence[int]]): For each node index, the indices of the
+        nodes it connects to
+
+    Returns:
+        bool: True if the target can be reached from the source, False otherwise
+    """
+
+    seen = bytearray(n_nodes)
+    stack = [source]
+    while stack:
+        for i in neighbours[stack.pop()]:
+            if i == target:
+                return True
+            if not seen[i]:
+                seen[i] = 1
+                stack.append(i)
+    return False
+
+
+class _CSRNeighbours:
+    """Sequence view giving the neighbours of each node in a CSR adjacency"""
+
+    __slots__ = ("_ptr", "_idx")
+
+    def __init__(self, ptr: array, idx: array):
+        self._ptr = ptr
+        self._idx = idx
+
+    def __len__(self) -> int:
+        return len(self._ptr) - 1
+
+    def __getitem__(self, i: int) -> array:
+        start, end = self._ptr[i], self._ptr[i + 1]
+        return self._idx[start:end]
+
+
+class CompactGraph:
+    """Immutable, array backed topology of a FeatureDAG
+
+    Nodes are identified by their integer index in the DAG. Both the child and parent
+    adjacency are stored in CSR (compressed sparse row) form, ie an array of offsets
+    with one entry per node plus one, and a flat array of neighbour indices. This
+    keeps the memory used by very large DAGs to a few bytes per node and edge, and
+    lets traversals run over flat integer arrays rather than Python objects.
+    """
+
+    __slots__ = ("n_nodes", "children", "parents")
+
+    def __init__(
+        self,
+        n_nodes: int,
+        child_ptr: array,
+        child_idx: array,
+        parent_ptr: array,
+        parent_idx: array,
+    ):
+        self.n_nodes = n_nodes
+        self.children = _CSRNeighbours(child_ptr, child_idx)
+        self.parents = _CSRNeighbours(parent_ptr, parent_idx)
+
+    @classmethod
+    def from_adjacency(cls, children: Sequence[Sequence[int]]) -> "CompactGraph":
+        """Builds a CompactGraph from per node lists of child indices
+
+        Args:
+            children (Sequence[Sequence[int]]): For each node index, the indices of
+            its children
+
+        Returns:
+            CompactGraph: The compact graph
+        """
+
+        n_nodes = len(children)
+
+        child_ptr = array("l", [0]) * (n_nodes + 1)
+        child_idx = array("l")
+        in_degree = array("l", [0]) * n_nodes
+        for i, node_children in enumerate(children):
+            child_idx.extend(node_children)
+            child_ptr[i + 1] = len(child_idx)
+            for c in node_children:
+                in_degree[c] += 1
+
+        parent_ptr = array("l", [0]) * (n_nodes + 1)
+        for i in range(n_nodes):
+            parent_ptr[i + 1] = parent_ptr[i] + in_degree[i]
+        parent_idx = array("l", [0]) * len(child_idx)
+        fill = array("l", parent_ptr[:-1])
+        for i, node_children in enumerate(children):
+            for c in node_children:
+                parent_idx[fill[c]] = i
+                fill[c] += 1
+
+        return cls(n_nodes, child_ptr, child_idx, parent_ptr, parent_idx)
+
+    def to_adjacency(self, parents: bool = False) -> List[List[int]]:
+        """Converts the graph back to per node lists of neighbour indices
+
+        Args:
+            parents (bool, optional): Return the parent rather than child lists.
+            Defaults to False.
+
+        Returns:
+            List[List[int]]: For each node index, the indices of its neighbours
+        """
+
+        neighbours = self.parents if parents else self.children
+        return [neighbours[i].tolist() for i in range(self.n_nodes)]
+
+    def in_degrees(self) -> array:
+        """Returns the number of parents of every node
+
+        Returns:
+            array: The number of parents of each node, by node index
+        """
+
+        ptr = self.parents._ptr
+        return array("l", (ptr[i + 1] - ptr[i] for i in range(self.n_nodes)))
+
+    def topological_order(self) -> array:
+        """Returns the node indices ordered so every node follows all its parents
+
+        Raises:
+            ValueError: If the graph contains a cycle
+
+        Returns:
+            array: The node indices in topological order
+        """
+
+        in_degree = self.in_degrees()
+        ready = deque(i for i in range(self.n_nodes) if in_degree[i] == 0)
+        order = array("l")
+        while ready:
+            i = ready.popleft()
+            order.append(i)
+            for c in self.children[i]:
+                in_degree[c] -= 1
+                if in_degree[c] == 0:
+                    ready.append(c)
+
+        if len(order) != self.n_nodes:
+            raise ValueError("The graph contains a cycle")
+        return order
+
+    def ancestors(self, sources: Iterable[int]) -> bytearray:
+        """Finds all ancestors of a set of nodes
+
+        Args:
+            sources (Iterable[int]): The indices of the nodes to start from
+
+        Returns:
+            bytearray: A mask with 1 for every ancestor node
+        """
+        return reachable(self.n_nodes, sources, self.parents)
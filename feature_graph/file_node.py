@@ -0,0 +1,165 @@
+from feature_graph.base import FeatureNode, import_object, object_import_name
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Union
+import hashlib
+import mmap
+import os
+
+# Size of the chunks a memory mapped file is hashed in. hashlib releases the GIL while
+# hashing large chunks, so files are hashed in parallel across threads.
+HASH_CHUNK_SIZE = 16 * 1024 * 1024
+
+
+def hash_file(path: str) -> str:
+    """Returns the md5 hash of a file's contents
+
+    The file is memory mapped and hashed in chunks, so it is never read into memory
+    in full.
+
+    Args:
+        path (str): The path of the file
+
+    Returns:
+        str: The hex md5 hash of the file
+    """
+
+    file_hash = hashlib.md5()
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # Empty files can't be memory mapped
+            return file_hash.hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                for start in range(0, len(mapped), HASH_CHUNK_SIZE):
+                    end = start + HASH_CHUNK_SIZE
+                    file_hash.update(view[start:end])
+            finally:
+                view.release()
+    return file_hash.hexdigest()
+
+
+class FileNode(FeatureNode):
+    __slots__ = ("_input_files", "_func", "_max_workers")
+
+    def __init__(
+        self,
+        name: str,
+        input_files: Union[str, List[str]],
+        func: Callable[[List[str]], None] = None,
+        max_workers: int = 8,
+    ):
+        """FileNode constructor
+
+        A node whose inputs are local files, eg CSV or Parquet drops or model
+        artifacts. The node is stale when the contents of any input file change.
+
+        Args:
+            name (str): The name of the node. Note, it must be a unique in a DAG
+            input_files (Union[str, List[str]]): The path, or list of paths, of the
+            node's input files
+            func (Callable[[List[str]], None], optional): The function run by the
+            node. It is called with the list of input files. Defaults to None.
+            max_workers (int, optional): The number of files to fingerprint in
+            parallel. Defaults to 8.
+        """
+        super().__init__(name=name)
+
+        if not isinstance(input_files, list):
+            input_files = [input_files]
+        self._input_files = [os.path.abspath(f) for f in input_files]
+        self._func = func
+        self._max_workers = max_workers
+
+    @property
+    def input_files(self) -> List[str]:
+        """Returns the absolute paths of the node's input files
+
+        Returns:
+            List[str]: The node's input files
+        """
+        return self._input_files
+
+    def run(self) -> None:
+        "Runs the node's function, if it has one, with the input files"
+
+        if self._func:
+            self._func(self._input_files)
+
+    def _fingerprint_file(self, path: str) -> str:
+        """Returns the md5 hash of a file, reusing the hash in the DAG state if the
+        file's last modified time and size are unchanged
+
+        Args:
+            path (str): The absolute path of the file
+
+        Raises:
+            FileNotFoundError: If the file doesn't exist
+
+        Returns:
+            str: The hex md5 hash of the file
+        """
+
+        if not os.path.exists(path):
+            raise FileNotFoundError("The input file {} is not found".format(path))
+
+        fingerprints = self._dag._state_table("fingerprints")
+        stat = os.stat(path)
+        cached = fingerprints.get(path, None)
+        if (
+            cached
+            and cached["mtime_ns"] == stat.st_mtime_ns
+            and cached["size"] == stat.st_size
+        ):
+            return cached["md5"]
+
+        digest = hash_file(path)
+        fingerprints[path] = {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "md5": digest,
+        }
+        return digest
+
+    def _calc_current_cache_tag(self) -> str:
+        """Used to check if the node needs to be run
+
+        The cache tag is the md5 hash of the sorted input file paths and the md5 hash
+        of each file's contents. A file's hash is only recalculated when its last
+        modified time or size has changed since it was last hashed, and files are
+        hashed in parallel.
+
+        Returns:
+            str: A string which changes when the contents of an input file changes
+        """
+
+        paths = sorted(self._input_files)
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            digests = list(executor.map(self._fingerprint_file, paths))
+
+        str_to_hash = "|".join(
+            "{}_{}".format(path, digest) for path, digest in zip(paths, digests)
+        )
+        return hashlib.md5(str_to_hash.encode("utf-8")).hexdigest()
+
+    def _compiled_record(self) -> dict:
+        """Returns the node's metadata to save in a compiled DAG
+
+        Returns:
+            dict: The node's input files, function and settings
+        """
+        return {
+            "input_files": self._input_files,
+            "func": object_import_name(self._func) if self._func else None,
+            "max_workers": self._max_workers,
+        }
+
+    def _load_compiled(self, record: dict) -> None:
+        """Restores the node from the metadata saved in a compiled DAG
+
+        Args:
+            record (dict): The metadata returned by `_compiled_record`
+        """
+        self._input_files = record["input_files"]
+        self._func = import_object(record["func"]) if record["func"] else None
+        self._max_workers = record["max_workers"]
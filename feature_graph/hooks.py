@@ -0,0 +1,82 @@
+from typing import Iterable, Optional
+
+
+class FeatureDAGHooks:
+    """Callbacks made by a FeatureDAG as it plans and runs, eg to trace or profile it
+
+    Subclass this and override the callbacks you need, then register an instance with
+    `FeatureDAG.add_hooks`. Every callback does nothing by default. Callbacks are made
+    synchronously, so they should be quick. `on_tag_computed` may be called from
+    several threads at once during `FeatureDAG.staleness_report`.
+    """
+
+    def on_run_start(self, targets: Optional[Iterable[str]]) -> None:
+        """Called when `FeatureDAG.run_feature_graph` starts
+
+        Args:
+            targets (Optional[Iterable[str]]): The nodes being built, or None for the
+            whole DAG
+        """
+
+    def on_run_end(self, error: Optional[BaseException]) -> None:
+        """Called when `FeatureDAG.run_feature_graph` finishes
+
+        Args:
+            error (Optional[BaseException]): The exception that stopped the run, or
+            None if it succeeded
+        """
+
+    def on_plan_start(self, targets: Optional[Iterable[str]]) -> None:
+        """Called when `FeatureDAG.staleness_report` starts checking the nodes
+
+        Args:
+            targets (Optional[Iterable[str]]): The nodes being checked, or None for
+            the whole DAG
+        """
+
+    def on_plan_end(self) -> None:
+        "Called when `FeatureDAG.staleness_report` has checked every node"
+
+    def on_node_ready(self, node: "FeatureNode") -> None:  # noqa: F821
+        """Called when all of a node's parents are complete and it is queued to run
+
+        Args:
+            node (FeatureNode): The node
+        """
+
+    def on_tag_computed(
+        self, node: "FeatureNode", cache_tag: str, duration: float  # noqa: F821
+    ) -> None:
+        """Called after a node's current cache tag is calculated
+
+        Args:
+            node (FeatureNode): The node
+            cache_tag (str): The node's current cache tag
+            duration (float): How long calculating the cache tag took, in seconds
+        """
+
+    def on_node_start(self, node: "FeatureNode") -> None:  # noqa: F821
+        """Called when a stale node starts running or is submitted
+
+        Args:
+            node (FeatureNode): The node
+        """
+
+    def on_node_end(self, node: "FeatureNode", status: str) -> None:  # noqa: F821
+        """Called when a node that started running has finished
+
+        Args:
+            node (FeatureNode): The node
+            status (str): How the node finished, eg "success"
+        """
+
+    def on_state_write(
+        self, node: "FeatureNode", cache_tag: str, duration: float  # noqa: F821
+    ) -> None:
+        """Called after a node's new cache tag is written to the state database
+
+        Args:
+            node (FeatureNode): The node
+            cache_tag (str): The node's new cache tag
+            duration (float): How long writing the cache tag took, in seconds
+        """
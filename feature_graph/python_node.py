@@ -0,0 +1,248 @@
+from feature_graph.base import FeatureNode, import_object, object_import_name
+from loguru import logger
+from typing import Callable, Dict, Optional
+import hashlib
+import inspect
+import os
+import tempfile
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover
+    pa = None
+
+DEFAULT_MAX_CACHE_BYTES = 10 * 1024**3
+
+
+class ArrowCache:
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_CACHE_BYTES):
+        """ArrowCache constructor
+
+        A content addressed cache of Arrow tables stored as Arrow IPC files. Tables
+        are read back memory mapped, so reading one doesn't copy its data. When the
+        cache grows beyond `max_bytes` the least recently used files are removed.
+
+        Args:
+            cache_dir (str): The directory to store the cached tables in
+            max_bytes (int, optional): The maximum size of the cache in bytes.
+            Defaults to 10GB.
+        """
+        self._cache_dir = cache_dir
+        self._max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        """Returns the path of the file a table is cached in
+
+        Args:
+            key (str): The table's key
+
+        Returns:
+            str: The path of the cache file
+        """
+        return os.path.join(self._cache_dir, "{}.arrow".format(key))
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.exists(self.path(key))
+
+    def get(self, key: str) -> Optional["pa.Table"]:
+        """Returns a memory mapped, zero copy view of a cached table
+
+        Args:
+            key (str): The table's key
+
+        Returns:
+            Optional[pa.Table]: The table, or None if it isn't in the cache
+        """
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None
+
+        # Mark the file as recently used
+        os.utime(path)
+        with pa.memory_map(path, "r") as source:
+            return pa.ipc.open_file(source).read_all()
+
+    def put(self, key: str, table: "pa.Table") -> None:
+        """Writes a table to the cache then evicts least recently used tables if the
+        cache is too large
+
+        Args:
+            key (str): The table's key
+            table (pa.Table): The table to cache
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self._cache_dir, suffix=".tmp")
+        os.close(fd)
+        try:
+            with pa.OSFile(tmp_path, "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            os.replace(tmp_path, self.path(key))
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        self.evict(keep=key)
+
+    def evict(self, keep: str = None) -> None:
+        """Removes the least recently used tables until the cache fits in max_bytes
+
+        Args:
+            keep (str, optional): The key of a table that must not be removed.
+            Defaults to None.
+        """
+        entries = []
+        for entry in os.scandir(self._cache_dir):
+            if entry.name.endswith(".arrow"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+
+        total_bytes = sum(size for _, size, _ in entries)
+        keep_path = self.path(keep) if keep else None
+        for _, size, path in sorted(entries):
+            if total_bytes <= self._max_bytes:
+                break
+            if path == keep_path:
+                continue
+            logger.debug("Evicting {} from the cache".format(path))
+            os.remove(path)
+            total_bytes -= size
+
+
+class PythonNode(FeatureNode):
+    __slots__ = ("_func", "_cache")
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[Dict[str, "pa.Table"]], "pa.Table"],
+        cache_dir: str = None,
+        max_cache_bytes: int = None,
+    ):
+        """PythonNode constructor
+
+        A node that runs a python function over columnar data. The function is
+        called with a dict mapping the name of each parent PythonNode to its output
+        table, and must return a pyarrow Table.
+
+        Outputs are stored in an ArrowCache keyed by the node's cache tag, which is a
+        hash of the function's source and the cache tags of the node's parents. A
+        rerun with the same inputs reads the cached output rather than calling the
+        function, and parents' outputs are passed to the function memory mapped.
+
+        Args:
+            name (str): The name of the node. Note, it must be a unique in a DAG
+            func (Callable[[Dict[str, pa.Table]], pa.Table]): The function to run
+            cache_dir (str, optional): The directory to cache outputs in. If not
+            supplied then it is taken from the "cache_dir" DAG parameter. Defaults to
+            None.
+            max_cache_bytes (int, optional): The maximum size of the cache. If not
+            supplied then it is taken from the "max_cache_bytes" DAG parameter, or
+            10GB. Defaults to None.
+
+        Raises:
+            ImportError: If pyarrow isn't installed
+            LookupError: If the cache_dir isn't specified or in the DAG parameters
+        """
+        if pa is None:
+            raise ImportError(
+                "PythonNode requires pyarrow, install it with feature-graph[arrow]"
+            )
+
+        super().__init__(name=name)
+
+        dag_params = self._dag.dag_params or {}
+        if not cache_dir:
+            if "cache_dir" not in dag_params:
+                raise LookupError(
+                    "cache_dir was not specified and was not found in the DAG "
+                    "parameters"
+                )
+            cache_dir = dag_params["cache_dir"]
+        if not max_cache_bytes:
+            max_cache_bytes = dag_params.get("max_cache_bytes", DEFAULT_MAX_CACHE_BYTES)
+
+        self._func = func
+        self._cache = ArrowCache(cache_dir, max_bytes=max_cache_bytes)
+
+    @property
+    def output(self) -> "pa.Table":
+        """Returns the node's output from its last run, memory mapped from the cache
+
+        Raises:
+            LookupError: If the node hasn't run or its output has been evicted
+
+        Returns:
+            pa.Table: The node's output
+        """
+        cache_tag = self._get_state_cache_tag
+        table = self._cache.get(cache_tag) if cache_tag else None
+        if table is None:
+            raise LookupError("Node {} has no cached output".format(self.name))
+        return table
+
+    def _func_hash(self) -> str:
+        """Returns a hash of the node's function
+
+        Returns:
+            str: The hex md5 hash of the function's source, or its bytecode if the
+            source isn't available
+        """
+        try:
+            code = inspect.getsource(self._func).encode("utf-8")
+        except (OSError, TypeError):
+            code = self._func.__code__.co_code
+        return hashlib.md5(code).hexdigest()
+
+    def _calc_current_cache_tag(self) -> str:
+        """Used to check if the node needs to be run
+
+        The cache tag is the md5 hash of the function and the cache tags stored in
+        the state for each parent, ie the content address of the parents' outputs.
+        It is also the key the node's output is cached under.
+
+        Returns:
+            str: A string which changes when the function or a parent's output changes
+        """
+        parent_tags = sorted(
+            "{}_{}".format(p.node_id, p._get_state_cache_tag) for p in self.parents
+        )
+        str_to_hash = "|".join([self._func_hash()] + parent_tags)
+        return hashlib.md5(str_to_hash.encode("utf-8")).hexdigest()
+
+    def run(self) -> None:
+        "Runs the function, unless its output for the current inputs is cached"
+
+        key = self._calc_current_cache_tag()
+        if key in self._cache:
+            logger.debug("Using cached output for {}".format(self.name))
+            return
+
+        inputs = {p.name: p.output for p in self.parents if isinstance(p, PythonNode)}
+        output = self._func(inputs)
+        if not isinstance(output, pa.Table):
+            raise TypeError(
+                "The function of node {} must return a pyarrow Table".format(self.name)
+            )
+        self._cache.put(key, output)
+
+    def _compiled_record(self) -> dict:
+        """Returns the node's metadata to save in a compiled DAG
+
+        Returns:
+            dict: The node's function and cache settings
+        """
+        return {
+            "func": object_import_name(self._func),
+            "cache_dir": self._cache._cache_dir,
+            "max_cache_bytes": self._cache._max_bytes,
+        }
+
+    def _load_compiled(self, record: dict) -> None:
+        """Restores the node from the metadata saved in a compiled DAG
+
+        Args:
+            record (dict): The metadata returned by `_compiled_record`
+        """
+        self._func = import_object(record["func"])
+        self._cache = ArrowCache(record["cache_dir"], record["max_cache_bytes"])
@@ -0,0 +1,111 @@
+from feature_graph.base import FeatureNode
+from typing import List, Set
+import hashlib
+import os
+
+
+class QueryNode(FeatureNode):
+    __slots__ = ("_query", "_query_file", "_input_tables")
+
+    def __init__(
+        self,
+        name: str,
+        query: str = None,
+        query_file: str = None,
+        query_params: dict = None,
+        input_tables: Set[str] = None,
+    ):
+        """QueryNode constructor
+
+        The base class of nodes that run a SQL query. It handles loading the query,
+        from a string or a file, and substituting in the query parameters.
+
+        Args:
+            name (str): The name of the node. Note, it must be a unique in a DAG
+            query (str, optional): The query to run. Defaults to None.
+            query_file (str, optional): The path of a file containing the query to run.
+            Defaults to None.
+            query_params (dict, optional): Parameters substituted into the query with
+            `str.format`. Defaults to None.
+            input_tables (Set[str], optional): The tables the query reads from. They
+            are used to check if the node needs rerunning. Defaults to None.
+
+        Raises:
+            ValueError: If both or neither of query and query_file are specified
+            FileNotFoundError: If the query_file doesn't exist
+        """
+        super().__init__(name=name)
+
+        if query and query_file:
+            raise ValueError("You can not specify both query and query_file")
+        if not query and not query_file:
+            raise ValueError("You must specify either query or query file")
+
+        if query:
+            query_str = query
+
+        if query_file:
+            if not os.path.exists(query_file):
+                raise FileNotFoundError(
+                    "The query_file {} is not found".format(query_file)
+                )
+            with open(query_file, "r") as f:
+                query_str = f.read()
+
+        self._query_file = query_file
+        self._query = query_str
+        if query_params:
+            self._query = query_str.format(**query_params)
+
+        if input_tables and not isinstance(input_tables, list):
+            input_tables = [input_tables]
+        self._input_tables = input_tables
+
+    @property
+    def query(self) -> str:
+        """Returns the query with the query_params substituted in
+
+        Returns:
+            str: The node's query
+        """
+        return self._query
+
+    @property
+    def query_hash(self) -> str:
+        """Returns the md5 hash of the query with the query_params substituted in
+
+        Returns:
+            str: The hex md5 hash of the query
+        """
+        return hashlib.md5(self._query.encode("utf-8")).hexdigest()
+
+    def _compiled_record(self) -> dict:
+        """Returns the node's metadata to save in a compiled DAG
+
+        Returns:
+            dict: The rendered query, its hash, query file and input tables
+        """
+        return {
+            "query": self._query,
+            "query_hash": self.query_hash,
+            "query_file": self._query_file,
+            "input_tables": self._input_tables,
+        }
+
+    def _load_compiled(self, record: dict) -> None:
+        """Restores the node from the metadata saved in a compiled DAG
+
+        Args:
+            record (dict): The metadata returned by `_compiled_record`
+        """
+        self._query = record["query"]
+        self._query_file = record["query_file"]
+        self._input_tables = record["input_tables"]
+
+    def _compiled_sources(self) -> List[str]:
+        """Returns the query file the node was built from, if any
+
+        Returns:
+            List[str]: The node's query file
+        """
+        return [self._query_file] if self._query_file else []
@@ -0,0 +1,212 @@
+from feature_graph.query_node import QueryNode
+from loguru import logger
+from typing import Dict, Iterable, Set
+import hashlib
+import sqlite3
+
+# Table in the local database holding a change counter for each table written by a
+# SQLiteNode
+TABLE_VERSIONS_TABLE = "_feature_graph_table_versions"
+
+_WRITE_ACTIONS = {
+    sqlite3.SQLITE_INSERT,
+    sqlite3.SQLITE_UPDATE,
+    sqlite3.SQLITE_DELETE,
+    sqlite3.SQLITE_CREATE_TABLE,
+    sqlite3.SQLITE_DROP_TABLE,
+}
+
+
+def get_table_versions(
+    conn: sqlite3.Connection, tables: Iterable[str]
+) -> Dict[str, int]:
+    """Returns the change counter of each table
+
+    Args:
+        conn (sqlite3.Connection): A connection to the local database
+        tables (Iterable[str]): The names of the tables
+
+    Returns:
+        Dict[str, int]: The change counter of each table, 0 if it has never been
+        written by a SQLiteNode
+    """
+
+    tables = [t.lower() for t in tables]
+    versions = dict.fromkeys(tables, 0)
+    try:
+        rows = conn.execute(
+            "SELECT table_name, version FROM {} WHERE table_name IN ({})".format(
+                TABLE_VERSIONS_TABLE, ",".join("?" * len(tables))
+            ),
+            tables,
+        ).fetchall()
+    except sqlite3.OperationalError:
+        # No SQLiteNode has written to the database yet
+        rows = []
+    versions.update(rows)
+    return versions
+
+
+def bump_table_versions(conn: sqlite3.Connection, tables: Iterable[str]) -> None:
+    """Increments the change counter of each table
+
+    Call this after writing to a table outside of a SQLiteNode so nodes reading it
+    rerun.
+
+    Args:
+        conn (sqlite3.Connection): A connection to the local database
+        tables (Iterable[str]): The names of the tables that changed
+    """
+
+    with conn:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS {} "
+            "(table_name TEXT PRIMARY KEY, version INTEGER NOT NULL)".format(
+                TABLE_VERSIONS_TABLE
+            )
+        )
+        for table in tables:
+            conn.execute(
+                "INSERT OR IGNORE INTO {} VALUES (?, 0)".format(TABLE_VERSIONS_TABLE),
+                (table.lower(),),
+            )
+            conn.execute(
+                "UPDATE {} SET version = version + 1 WHERE table_name = ?".format(
+                    TABLE_VERSIONS_TABLE
+                ),
+                (table.lower(),),
+            )
+
+
+class SQLiteNode(QueryNode):
+    __slots__ = ("_database",)
+
+    def __init__(
+        self,
+        name: str,
+        query: str = None,
+        query_file: str = None,
+        database: str = None,
+        query_params: dict = None,
+        input_tables: Set[str] = None,
+    ):
+        """SQLiteNode constructor
+
+        A node that runs its query in process against a local SQLite database file.
+        It is useful for small feature steps and for running DAGs without a network,
+        eg in tests and benchmarks.
+
+        Args:
+            name (str): The name of the node. Note, it must be a unique in a DAG
+            query (str, optional): The query to run. It may contain several
+            statements. Defaults to None.
+            query_file (str, optional): The path of a file containing the query to run.
+            Defaults to None.
+            database (str, optional): The path of the SQLite database. If not supplied
+            then it is taken from the "database" DAG parameter. Defaults to None.
+            query_params (dict, optional): Parameters substituted into the query with
+            `str.format`. Defaults to None.
+            input_tables (Set[str], optional): The tables the query reads from. They
+            are used to check if the node needs rerunning. Defaults to None.
+
+        Raises:
+            LookupError: If the database isn't specified or in the DAG parameters
+        """
+        super().__init__(
+            name=name,
+            query=query,
+            query_file=query_file,
+            query_params=query_params,
+            input_tables=input_tables,
+        )
+
+        self._database = database
+        if not self._database:
+            if not self._dag.dag_params or "database" not in self._dag.dag_params:
+                raise LookupError(
+                    "database was not specified and was not found in the DAG "
+                    "parameters"
+                )
+            self._database = self._dag.dag_params["database"]
+
+    @property
+    def database(self) -> str:
+        """Returns the path of the node's SQLite database
+
+        Returns:
+            str: The path of the database
+        """
+        return self._database
+
+    def run(self) -> None:
+        """Runs the query against the local database
+
+        The tables the query writes to are recorded with an authorizer callback and
+        their change counters incremented once the query finishes.
+        """
+
+        logger.debug("Query: {}".format(self._query))
+
+        written_tables = set()
+
+        def authorizer(action, arg1, arg2, db_name, trigger):
+            if action in _WRITE_ACTIONS and db_name in ("main", None):
+                table = arg1.lower()
+                if not table.startswith("sqlite_") and table != TABLE_VERSIONS_TABLE:
+                    written_tables.add(table)
+            return sqlite3.SQLITE_OK
+
+        conn = sqlite3.connect(self._database)
+        try:
+            conn.set_authorizer(authorizer)
+            conn.executescript(self._query)
+            conn.set_authorizer(None)
+            bump_table_versions(conn, sorted(written_tables))
+        finally:
+            conn.close()
+
+    def _calc_current_cache_tag(self) -> str:
+        """Used to check if the node needs to be run
+
+        The cache tag is the md5 hash of the query, with the query_params substituted
+        in, and the change counter of each input table. Counters are incremented
+        whenever a SQLiteNode writes to a table.
+
+        Returns:
+            str: A string which changes when the query or an input table changes
+        """
+
+        str_to_hash = self._query
+
+        if self._input_tables:
+            conn = sqlite3.connect(self._database)
+            try:
+                versions = get_table_versions(conn, self._input_tables)
+            finally:
+                conn.close()
+
+            str_to_hash += "|".join(
+                "{}_{}".format(table, version)
+                for table, version in sorted(versions.items())
+            )
+
+        return hashlib.md5(str_to_hash.encode("utf-8")).hexdigest()
+
+    def _compiled_record(self) -> dict:
+        """Returns the node's metadata to save in a compiled DAG
+
+        Returns:
+            dict: The rendered query, its hash and the node's settings
+        """
+        record = super()._compiled_record()
+        record["database"] = self._database
+        return record
+
+    def _load_compiled(self, record: dict) -> None:
+        """Restores the node from the metadata saved in a compiled DAG
+
+        Args:
+            record (dict): The metadata returned by `_compiled_record`
+        """
+        super()._load_compiled(record)
+        self._database = record["database"]
@@ -0,0 +1,358 @@
+from feature_graph.hooks import FeatureDAGHooks
+from typing import Iterable, List, NamedTuple, Optional
+import json
+import os
+import threading
+import time
+
+# Chrome trace-event thread ID used for run and plan spans. Each node's spans are on
+# their own thread, with ID node index + 1, so they appear as one row per node.
+DAG_TID = 0
+
+
+class Span(NamedTuple):
+    name: str
+    category: str
+    node_name: Optional[str]
+    tid: int
+    start_ns: int
+    end_ns: int
+    trace_id: str
+    span_id: str
+    parent_span_id: Optional[str]
+    attributes: dict
+    is_error: bool
+
+
+def _new_id(n_bytes: int) -> str:
+    """Returns a random hex ID
+
+    Args:
+        n_bytes (int): The number of random bytes
+
+    Returns:
+        str: The hex ID
+    """
+    return os.urandom(n_bytes).hex()
+
+
+def _otlp_value(value) -> dict:
+    """Returns an attribute value in OTLP JSON form
+
+    Args:
+        value (Any): The attribute value
+
+    Returns:
+        dict: The typed OTLP value
+    """
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class Tracer(FeatureDAGHooks):
+    def __init__(self, service_name: str = "feature_graph"):
+        """Tracer constructor
+
+        Records where wall clock time goes while a FeatureDAG plans and runs, as
+        spans which can be written as Chrome trace-event JSON, for chrome://tracing
+        or Perfetto, or as OTLP JSON, for OpenTelemetry collectors. Register it with
+        `FeatureDAG.add_hooks`.
+
+        Each run or staleness report is a root span. Each node gets child spans for
+        the time it was queued waiting to be checked, the time calculating its cache
+        tag, the time running and the time writing its new cache tag to the state.
+
+        Args:
+            service_name (str, optional): The OTLP service.name resource attribute.
+            Defaults to "feature_graph".
+        """
+        self._service_name = service_name
+        self._lock = threading.Lock()
+        self._spans = []
+        self._open = {}
+        self._root = None
+
+    @property
+    def spans(self) -> List[Span]:
+        """Returns the completed spans
+
+        Returns:
+            List[Span]: The completed spans, in the order they finished
+        """
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self) -> None:
+        "Removes all recorded spans"
+
+        with self._lock:
+            self._spans = []
+            self._open = {}
+            self._root = None
+
+    def _open_span(
+        self,
+        key: tuple,
+        name: str,
+        category: str,
+        node: "FeatureNode" = None,  # noqa: F821
+        attributes: dict = None,
+    ) -> None:
+        """Starts a span which is ended by `_close_span`
+
+        Args:
+            key (tuple): The key the open span is stored under
+            name (str): The name of the span
+            category (str): The category of the span
+            node (FeatureNode, optional): The node the span is for. Defaults to None.
+            attributes (dict, optional): The span's attributes. Defaults to None.
+        """
+        with self._lock:
+            self._open[key] = (name, category, node, time.time_ns(), attributes or {})
+
+    def _close_span(
+        self, key: tuple, end_ns: int = None, attributes: dict = None, is_error=False
+    ) -> None:
+        """Ends a span started by `_open_span`, if it is open
+
+        Args:
+            key (tuple): The key the open span is stored under
+            end_ns (int, optional): When the span ended. Defaults to now.
+            attributes (dict, optional): Attributes to add to the span. Defaults to
+            None.
+            is_error (bool, optional): Whether the span ended in an error. Defaults to
+            False.
+        """
+        end_ns = end_ns or time.time_ns()
+        with self._lock:
+            if key not in self._open:
+                return
+            name, category, node, start_ns, span_attributes = self._open.pop(key)
+            span_attributes.update(attributes or {})
+            self._add_span(
+                name, category, node, start_ns, end_ns, span_attributes, is_error
+            )
+
+    def _add_span(
+        self,
+        name: str,
+        category: str,
+        node: "FeatureNode",  # noqa: F821
+        start_ns: int,
+        end_ns: int,
+        attributes: dict,
+        is_error: bool = False,
+    ) -> None:
+        """Records a completed span. The caller must hold the lock.
+
+        Args:
+            name (str): The name of the span
+            category (str): The category of the span
+            node (FeatureNode): The node the span is for, or None for a root span
+            start_ns (int): When the span started, in nanoseconds since the epoch
+            end_ns (int): When the span ended, in nanoseconds since the epoch
+            attributes (dict): The span's attributes
+            is_error (bool, optional): Whether the span ended in an error. Defaults to
+            False.
+        """
+        if node is None:
+            trace_id, span_id = self._root
+            parent_span_id = None
+            self._root = None
+        else:
+            trace_id, parent_span_id = self._root or (_new_id(16), None)
+            span_id = _new_id(8)
+
+        self._spans.append(
+            Span(
+                name=name,
+                category=category,
+                node_name=node.name if node is not None else None,
+                tid=node._index + 1 if node is not None else DAG_TID,
+                start_ns=start_ns,
+                end_ns=end_ns,
+                trace_id=trace_id,
+                span_id=span_id,
+                parent_span_id=parent_span_id,
+                attributes=attributes,
+                is_error=is_error,
+            )
+        )
+
+    def _start_root(self, name: str, targets: Optional[Iterable[str]]) -> None:
+        """Starts a run or plan root span
+
+        Args:
+            name (str): The name of the span
+            targets (Optional[Iterable[str]]): The targets of the run or plan
+        """
+        with self._lock:
+            self._root = (_new_id(16), _new_id(8))
+        attributes = {"targets": ",".join(targets)} if targets else {}
+        self._open_span(("root",), name, "dag", attributes=attributes)
+
+    def on_run_start(self, targets: Optional[Iterable[str]]) -> None:
+        self._start_root("run_feature_graph", targets)
+
+    def on_run_end(self, error: Optional[BaseException]) -> None:
+        attributes = {"error": repr(error)} if error is not None else {}
+        self._close_span(("root",), attributes=attributes, is_error=error is not None)
+
+    def on_plan_start(self, targets: Optional[Iterable[str]]) -> None:
+        self._start_root("staleness_report", targets)
+
+    def on_plan_end(self) -> None:
+        self._close_span(("root",))
+
+    def on_node_ready(self, node: "FeatureNode") -> None:  # noqa: F821
+        self._open_span(("queued", node._index), "queued", "queue", node)
+
+    def on_tag_computed(
+        self, node: "FeatureNode", cache_tag: str, duration: float  # noqa: F821
+    ) -> None:
+        end_ns = time.time_ns()
+        start_ns = end_ns - int(duration * 1e9)
+        # Queueing ends when the cache tag calculation starts
+        self._close_span(("queued", node._index), end_ns=start_ns)
+        with self._lock:
+            self._add_span(
+                "cache_tag", "tag", node, start_ns, end_ns, {"cache_tag": cache_tag}
+            )
+
+    def on_node_start(self, node: "FeatureNode") -> None:  # noqa: F821
+        self._open_span(("run", node._index), "run", "run", node)
+
+    def on_node_end(self, node: "FeatureNode", status: str) -> None:  # noqa: F821
+        self._close_span(
+            ("run", node._index),
+            attributes={"status": status},
+            is_error=status != "success",
+        )
+
+    def on_state_write(
+        self, node: "FeatureNode", cache_tag: str, duration: float  # noqa: F821
+    ) -> None:
+        end_ns = time.time_ns()
+        start_ns = end_ns - int(duration * 1e9)
+        with self._lock:
+            self._add_span(
+                "state_write", "state", node, start_ns, end_ns, {"cache_tag": cache_tag}
+            )
+
+    def chrome_trace(self) -> dict:
+        """Returns the spans in Chrome trace-event format
+
+        Returns:
+            dict: The trace, with one complete ("X") event per span and one row per
+            node
+        """
+        spans = self.spans
+        origin_ns = min((s.start_ns for s in spans), default=0)
+
+        events = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": 1,
+                "tid": DAG_TID,
+                "args": {"name": "feature_graph"},
+            }
+        ]
+        thread_names = {}
+        for span in spans:
+            if span.node_name is not None:
+                thread_names[span.tid] = span.node_name
+            events.append(
+                {
+                    "name": span.name,
+                    "cat": span.category,
+                    "ph": "X",
+                    "ts": (span.start_ns - origin_ns) / 1000,
+                    "dur": (span.end_ns - span.start_ns) / 1000,
+                    "pid": 1,
+                    "tid": span.tid,
+                    "args": dict(span.attributes, node=span.node_name),
+                }
+            )
+        for tid, node_name in sorted(thread_names.items()):
+            events.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": 1,
+                    "tid": tid,
+                    "args": {"name": node_name},
+                }
+            )
+
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def otlp_json(self) -> dict:
+        """Returns the spans in the OTLP JSON format of an ExportTraceServiceRequest
+
+        Returns:
+            dict: The trace, which can be posted to a collector's /v1/traces endpoint
+        """
+        otlp_spans = []
+        for span in self.spans:
+            attributes = dict(span.attributes, category=span.category)
+            if span.node_name is not None:
+                attributes["node"] = span.node_name
+            otlp_span = {
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                # SPAN_KIND_INTERNAL
+                "kind": 1,
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": [
+                    {"key": k, "value": _otlp_value(v)} for k, v in attributes.items()
+                ],
+                # STATUS_CODE_ERROR or STATUS_CODE_OK
+                "status": {"code": 2 if span.is_error else 1},
+            }
+            if span.parent_span_id:
+                otlp_span["parentSpanId"] = span.parent_span_id
+            otlp_spans.append(otlp_span)
+
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {
+                                "key": "service.name",
+                                "value": {"stringValue": self._service_name},
+                            }
+                        ]
+                    },
+                    "scopeSpans": [
+                        {"scope": {"name": "feature_graph"}, "spans": otlp_spans}
+                    ],
+                }
+            ]
+        }
+
+    def write_chrome_trace(self, path: str) -> None:
+        """Writes the spans to a Chrome trace-event JSON file
+
+        Args:
+            path (str): The path of the file
+        """
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
+
+    def write_otlp_json(self, path: str) -> None:
+        """Writes the spans to an OTLP JSON file
+
+        Args:
+            path (str): The path of the file
+        """
+        with open(path, "w") as f:
+            json.dump(self.otlp_json(), f)
@@ -1,8 +1,14 @@
-from feature_graph.base import FeatureDAG
-from feature_graph.bigquery_node import BigQueryNode
+from feature_graph.base import FeatureDAG, FeatureNode
+from feature_graph.bigquery_node import (
+    BigQueryJobPoller,
+    BigQueryMapNode,
+    BigQueryNode,
+)
 import pytest
 import os
-from datetime import datetime
+import time
+from datetime import datetime, timezone
+from google.api_core.exceptions import Conflict, NotFound
 from google.cloud import bigquery
 from unittest.mock import MagicMock
 
@@ -190,3 +196,548 @@ def test_calc_cache_with_input_tables():
         )
 
     assert node_a_catch_tag != b._calc_current_cache_tag()
+
+
+def make_listed_job(job_id, error_result=None):
+    listed_job = MagicMock(error_result=error_result)
+    listed_job.job_id = job_id
+    return listed_job
+
+
+def test_bigquery_nodes_polled_in_bulk(monkeypatch):
+
+    monkeypatch.setattr(BigQueryJobPoller, "min_interval", 0.0)
+
+    client = MagicMock()
+    submitted = []
+
+    def query(query, project, **kwargs):
+        job = MagicMock(project=project)
+        job.job_id = "job_{}".format(len(submitted))
+        submitted.append(job)
+        return job
+
+    client.query = MagicMock(side_effect=query)
+    client.list_jobs = MagicMock(
+        side_effect=lambda **kwargs: [make_listed_job(j.job_id) for j in submitted]
+    )
+
+    with FeatureDAG(dag_params={"project": "my-project"}) as dag:
+        a = BigQueryNode(name="query a", query="SELECT 1", client=client)
+        b = BigQueryNode(name="query b", query="SELECT 2", client=client)
+        c = BigQueryNode(name="query c", query="SELECT 3", client=client)
+
+        [a, b] >> c
+
+    dag.run_feature_graph()
+
+    assert client.query.call_count == 3
+    # a and b are submitted and polled together, then c
+    assert client.list_jobs.call_count == 2
+    for job in submitted:
+        job.result.assert_not_called()
+    assert not any(n.is_node_stale for n in [a, b, c])
+
+
+def test_bigquery_job_poller_raises_failed_job():
+
+    client = MagicMock()
+    job = MagicMock(project="my-project")
+    job.job_id = "job_0"
+    job.result = MagicMock(side_effect=RuntimeError("query failed"))
+    client.list_jobs = MagicMock(
+        return_value=[make_listed_job("job_0", error_result={"reason": "invalid"})]
+    )
+
+    with FeatureDAG(dag_params={"project": "my-project"}):
+        a = BigQueryNode(name="query a", query="SELECT 1", client=client)
+
+    poller = BigQueryJobPoller()
+    poller.add(job, a)
+
+    with pytest.raises(RuntimeError):
+        poller.poll()
+
+
+def test_compile_and_load(tmp_path):
+
+    query_file = str(tmp_path / "query_b.sql")
+    with open(query_file, "w") as f:
+        f.write("SELECT {value}")
+
+    compiled_file = str(tmp_path / "dag.json")
+
+    with FeatureDAG(dag_params={"project": "my-project"}) as dag:
+        a = BigQueryNode(name="query a", query="SELECT 1", input_tables="ds.table")
+        b = BigQueryNode(
+            name="query b", query_file=query_file, query_params={"value": 2}
+        )
+        c = FeatureNode(name="node c")
+
+        a >> b >> c
+
+    dag.compile(compiled_file)
+
+    loaded = FeatureDAG.load_compiled(compiled_file)
+
+    assert loaded.dag_params == {"project": "my-project"}
+    loaded_a, loaded_b, loaded_c = loaded._nodes
+    assert isinstance(loaded_b, BigQueryNode)
+    assert type(loaded_c) is FeatureNode
+    assert loaded_b._query == "SELECT 2"
+    assert loaded_b.query_hash == b.query_hash
+    assert loaded_a._input_tables == ["ds.table"]
+    assert loaded_a.project == "my-project"
+    assert loaded_a._client is None
+    assert loaded_b in loaded_a.children
+    assert loaded_c in loaded_b.children
+    assert loaded_b._calc_current_cache_tag() == b._calc_current_cache_tag()
+
+    # Touching a source file without changing it keeps the compiled DAG valid
+    os.utime(query_file, ns=(0, 0))
+    assert FeatureDAG.load_compiled(compiled_file) is not None
+
+    with open(query_file, "w") as f:
+        f.write("SELECT {value} + 1")
+    assert FeatureDAG.load_compiled(compiled_file) is None
+
+
+def test_load_compiled_missing_file(tmp_path):
+
+    assert FeatureDAG.load_compiled(str(tmp_path / "missing.json")) is None
+
+
+def test_bigquery_job_poller_falls_back_when_listing_truncated(monkeypatch):
+
+    monkeypatch.setattr(BigQueryJobPoller, "list_page_size", 2)
+
+    client = MagicMock()
+    job = MagicMock(project="my-project")
+    job.job_id = "job_0"
+    # The first page is filled by other workloads' jobs
+    client.list_jobs = MagicMock(
+        return_value=[make_listed_job("other_1"), make_listed_job("other_2")]
+    )
+    client.get_job = MagicMock(return_value=MagicMock(state="DONE", error_result=None))
+
+    with FeatureDAG(dag_params={"project": "my-project"}):
+        a = BigQueryNode(name="query a", query="SELECT 1", client=client)
+
+    poller = BigQueryJobPoller()
+    poller.add(job, a)
+
+    assert poller.poll() == [(job, a)]
+    assert client.list_jobs.call_args[1]["max_results"] == 2
+    client.get_job.assert_called_once_with("job_0", project="my-project")
+    assert len(poller) == 0
+
+
+def test_bigquery_job_poller_no_fallback_when_listing_complete():
+
+    client = MagicMock()
+    job = MagicMock(project="my-project")
+    job.job_id = "job_0"
+    client.list_jobs = MagicMock(return_value=[make_listed_job("other_1")])
+
+    with FeatureDAG(dag_params={"project": "my-project"}):
+        a = BigQueryNode(name="query a", query="SELECT 1", client=client)
+
+    poller = BigQueryJobPoller()
+    poller.add(job, a)
+
+    assert poller.poll() == []
+    client.get_job.assert_not_called()
+    assert len(poller) == 1
+
+
+def test_staleness_report_fetches_tables_concurrently():
+
+    def slow_get_table(tbl_ref):
+        time.sleep(0.2)
+        return MagicMock(modified=datetime.now())
+
+    client = MagicMock()
+    client.get_table = MagicMock(side_effect=slow_get_table)
+
+    with FeatureDAG(dag_params={"project": "my-project"}) as dag:
+        for i in range(8):
+            BigQueryNode(
+                name="query {}".format(i),
+                query="SELECT {}".format(i),
+                input_tables="ds.table_{}".format(i),
+                client=client,
+            )
+
+    start = time.monotonic()
+    report = dag.staleness_report(max_workers=8)
+
+    assert time.monotonic() - start < 1.0
+    assert len(report.stale) == 8
+    assert client.get_table.call_count == 8
+
+
+def make_map_client(max_running):
+    client = MagicMock()
+    running = []
+    submitted = []
+
+    def query(query, project, **kwargs):
+        assert len(running) < max_running
+        job = MagicMock(project=project)
+        job.job_id = "job_{}".format(len(submitted))
+        running.append(job)
+        submitted.append(query)
+        return job
+
+    def list_jobs(**kwargs):
+        done = [make_listed_job(j.job_id) for j in running]
+        running.clear()
+        return done
+
+    client.query = MagicMock(side_effect=query)
+    client.list_jobs = MagicMock(side_effect=list_jobs)
+    return client, submitted
+
+
+def test_map_node_runs_stale_shards_with_bounded_concurrency(monkeypatch):
+
+    monkeypatch.setattr(BigQueryJobPoller, "min_interval", 0.0)
+    client, submitted = make_map_client(max_running=2)
+
+    param_list = [{"country": c} for c in ["gb", "us", "fr", "de", "es"]]
+    with FeatureDAG(dag_params={"project": "my-project"}) as dag:
+        a = BigQueryMapNode(
+            name="query a",
+            query="SELECT '{country}' AS country, {value} AS value",
+            query_params={"value": 1},
+            param_list=param_list,
+            client=client,
+            max_concurrency=2,
+        )
+        b = BigQueryNode(name="query b", query="SELECT 1", client=client)
+
+        a >> b
+
+    dag.run_feature_graph()
+
+    assert submitted[:5] == [
+        "SELECT '{}' AS country, 1 AS value".format(p["country"]) for p in param_list
+    ]
+    assert submitted[5] == "SELECT 1"
+    assert not a.is_node_stale
+    assert a._dot_label == "query a [5 shards]"
+
+    # Only the shard whose parameters changed is rerun
+    submitted.clear()
+    with FeatureDAG(dag_params={"project": "my-project"}) as dag_2:
+        a_2 = BigQueryMapNode(
+            name="query a",
+            query="SELECT '{country}' AS country, {value} AS value",
+            query_params={"value": 1},
+            param_list=param_list[:4] + [{"country": "it"}],
+            client=client,
+            max_concurrency=2,
+        )
+    dag_2._state_dict = dag._state_dict
+
+    dag_2.run_feature_graph()
+
+    assert submitted == ["SELECT 'it' AS country, 1 AS value"]
+    assert not a_2.is_node_stale
+
+
+def test_map_node_clear_state():
+
+    client, submitted = make_map_client(max_running=10)
+
+    with FeatureDAG(dag_params={"project": "my-project"}) as dag:
+        a = BigQueryMapNode(
+            name="query a",
+            query="SELECT {day}",
+            param_list=[{"day": 1}, {"day": 2}],
+            client=client,
+        )
+
+    a.run()
+    assert len(submitted) == 2
+    assert a._stale_shards() == []
+
+    a.clear_state()
+    assert a._stale_shards() == [0, 1]
+    assert list(dag._state_dict.keys()) == []
+
+
+def test_map_node_empty_param_list():
+
+    with FeatureDAG(dag_params={"project": "my-project"}):
+        with pytest.raises(ValueError):
+            _ = BigQueryMapNode(name="query a", query="SELECT {day}", param_list=[])
+
+
+def test_compact_state_keeps_map_node_shards():
+
+    client, _ = make_map_client(max_running=10)
+
+    with FeatureDAG(dag_params={"project": "my-project"}) as dag:
+        a = BigQueryMapNode(
+            name="query a",
+            query="SELECT {day}",
+            param_list=[{"day": 1}, {"day": 2}],
+            client=client,
+        )
+
+    a.run()
+    dag._state_dict["removed_node_id/shard"] = "tag"
+    dag.compact_state()
+
+    assert a._stale_shards() == []
+    assert "removed_node_id/shard" not in dag._state_dict
+
+
+def make_dry_run_client(lineage):
+    """Returns a mock client whose dry runs report the tables in lineage, a dict
+    mapping each query to the tables it reads and the table it writes"""
+
+    def query(query, project, job_config=None, **kwargs):
+        assert job_config.dry_run
+        referenced, destination = lineage[query]
+        job = MagicMock(ddl_target_table=None, destination=None)
+        job.referenced_tables = [
+            bigquery.table.TableReference.from_string(t) for t in referenced
+        ]
+        if destination:
+            job.ddl_target_table = bigquery.table.TableReference.from_string(
+                destination
+            )
+        return job
+
+    def get_table(tbl_ref):
+        return MagicMock(
+            project=tbl_ref.project,
+            dataset_id=tbl_ref.dataset_id,
+            table_id=tbl_ref.table_id,
+            modified=datetime(2024, 1, 1),
+        )
+
+    client = MagicMock()
+    client.query = MagicMock(side_effect=query)
+    client.get_table = MagicMock(side_effect=get_table)
+    return client
+
+
+def test_dry_run_tables_cached_by_query():
+
+    client = make_dry_run_client(
+        {"SELECT 1": (["p.ds.source", "p.ds.target"], "p.ds.target")}
+    )
+
+    with FeatureDAG(dag_params={"project": "p"}):
+        a = BigQueryNode(name="query a", query="SELECT 1", client=client)
+        b = BigQueryNode(name="query b", query="SELECT 1", client=client)
+
+    assert a.dry_run_tables(a.query) == (["p.ds.source"], ["p.ds.target"])
+    assert b.dry_run_tables(b.query) == (["p.ds.source"], ["p.ds.target"])
+    assert client.query.call_count == 1
+
+
+def test_cache_tag_uses_inferred_input_tables():
+
+    client = make_dry_run_client({"SELECT 1": (["p.ds.source"], None)})
+
+    with FeatureDAG(dag_params={"project": "p"}):
+        a = BigQueryNode(name="query a", query="SELECT 1", client=client)
+        b = BigQueryNode(
+            name="query b", query="SELECT 1", client=client, infer_input_tables=True
+        )
+
+    a_tag = a._calc_current_cache_tag()
+    client.get_table.assert_not_called()
+
+    b_tag = b._calc_current_cache_tag()
+    assert str(client.get_table.call_args[0][0]) == "p.ds.source"
+    assert a_tag != b_tag
+
+
+def test_infer_edges():
+
+    client = make_dry_run_client(
+        {
+            "CREATE TABLE ds.base AS SELECT 1": (["p.raw.events"], "p.ds.base"),
+            "CREATE TABLE ds.feat AS SELECT 2": (["p.ds.base"], "p.ds.feat"),
+            "CREATE TABLE ds.final AS SELECT 3": (
+                ["p.ds.base", "p.ds.feat"],
+                "p.ds.final",
+            ),
+        }
+    )
+
+    with FeatureDAG(dag_params={"project": "p"}) as dag:
+        base = BigQueryNode(
+            name="base", query="CREATE TABLE ds.base AS SELECT 1", client=client
+        )
+        feat = BigQueryNode(
+            name="feat", query="CREATE TABLE ds.feat AS SELECT 2", client=client
+        )
+        final = BigQueryNode(
+            name="final", query="CREATE TABLE ds.final AS SELECT 3", client=client
+        )
+        other = FeatureNode(name="other")
+
+        # Existing edges are kept
+        base >> final
+
+    added = dag.infer_edges()
+
+    assert set(added) == {(base, feat), (feat, final)}
+    assert base.children == {feat, final}
+    assert final.parents == {base, feat}
+    assert not other.parents and not other.children
+
+
+def test_infer_edges_duplicate_producer():
+
+    client = make_dry_run_client(
+        {
+            "SELECT 1": ([], "p.ds.table"),
+            "SELECT 2": ([], "p.ds.table"),
+        }
+    )
+
+    with FeatureDAG(dag_params={"project": "p"}) as dag:
+        BigQueryNode(name="query a", query="SELECT 1", client=client)
+        BigQueryNode(name="query b", query="SELECT 2", client=client)
+
+    with pytest.raises(ValueError):
+        dag.infer_edges()
+
+
+def test_table_lineage_falls_back_when_table_missing():
+
+    client = MagicMock()
+    client.query = MagicMock(side_effect=NotFound("Table p:ds.base not found"))
+
+    with FeatureDAG(dag_params={"project": "p"}) as dag:
+        a = BigQueryNode(
+            name="query a", query="SELECT 1", input_tables="ds.base", client=client
+        )
+
+    assert a._table_lineage() == (["p.ds.base"], [])
+    # The failure isn't cached
+    assert list(dag._state_table("dry_run").keys()) == []
+
+
+def test_run_cancels_job_on_timeout():
+
+    client = MagicMock()
+    job = MagicMock(state="RUNNING")
+    job.result = MagicMock(side_effect=TimeoutError())
+    client.query = MagicMock(return_value=job)
+
+    with FeatureDAG(dag_params={"project": "my-project"}):
+        a = BigQueryNode(name="query a", query="SELECT 1", client=client, timeout=5)
+
+    with pytest.raises(TimeoutError):
+        a.run()
+
+    job.result.assert_called_once_with(timeout=5)
+    job.cancel.assert_called_once_with()
+
+
+def test_failed_job_cancels_in_flight_jobs(monkeypatch):
+
+    monkeypatch.setattr(BigQueryJobPoller, "min_interval", 0.0)
+
+    client = MagicMock()
+    jobs = {}
+
+    def query(query, project, **kwargs):
+        job = MagicMock(project=project)
+        job.job_id = query
+        job.result = MagicMock(side_effect=RuntimeError("query failed"))
+        jobs[query] = job
+        return job
+
+    client.query = MagicMock(side_effect=query)
+    client.list_jobs = MagicMock(
+        return_value=[make_listed_job("SELECT 1", error_result={"reason": "invalid"})]
+    )
+
+    with FeatureDAG(dag_params={"project": "my-project"}) as dag:
+        a = BigQueryNode(name="query a", query="SELECT 1", client=client)
+        b = BigQueryNode(name="query b", query="SELECT 2", client=client)
+
+    with pytest.raises(RuntimeError):
+        dag.run_feature_graph()
+
+    jobs["SELECT 1"].cancel.assert_not_called()
+    jobs["SELECT 2"].cancel.assert_called_once_with()
+    runs = dag.last_runs()
+    assert runs[a.node_id]["status"] == "failed"
+    assert runs[b.node_id]["status"] == "cancelled"
+    assert a.is_node_stale and b.is_node_stale
+
+
+def test_job_ids_are_deterministic():
+
+    client = MagicMock()
+    client.query = MagicMock(return_value=MagicMock(state="DONE"))
+
+    with FeatureDAG(dag_params={"project": "my-project"}) as dag:
+        a = BigQueryNode(name="query a", query="SELECT 1", client=client)
+
+    job_id = a._job_id(a._calc_current_cache_tag())
+    assert job_id.startswith("feature_graph_{}_".format(a.node_id))
+    assert a._job_id(a._calc_current_cache_tag()) == job_id
+    assert a._job_id("other tag") != job_id
+
+    dag.run_feature_graph()
+    assert client.query.call_args[1]["job_id"] == job_id
+
+    # Once the run is recorded the next run gets a new ID
+    a.clear_state()
+    assert a._job_id(a._calc_current_cache_tag()) != job_id
+
+
+def test_restarted_run_reattaches_to_existing_job(monkeypatch):
+
+    monkeypatch.setattr(BigQueryJobPoller, "min_interval", 0.0)
+
+    created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    existing_job = MagicMock(project="my-project", state="RUNNING", created=created)
+    existing_job.job_id = "existing"
+
+    client = MagicMock()
+    client.query = MagicMock(side_effect=Conflict("Already Exists"))
+    client.get_job = MagicMock(return_value=existing_job)
+    client.list_jobs = MagicMock(return_value=[make_listed_job("existing")])
+
+    with FeatureDAG(dag_params={"project": "my-project"}) as dag:
+        a = BigQueryNode(name="query a", query="SELECT 1", client=client)
+
+    dag.run_feature_graph()
+
+    job_id = client.query.call_args[1]["job_id"]
+    client.get_job.assert_called_once_with(job_id, project="my-project")
+    assert client.query.call_count == 1
+    # The listing covers jobs created before the run started
+    assert client.list_jobs.call_args[1]["min_creation_time"] < created
+    assert not a.is_node_stale
+
+
+def test_failed_existing_job_is_retried():
+
+    failed_job = MagicMock(state="DONE", error_result={"reason": "stopped"})
+    new_job = MagicMock(state="DONE")
+
+    client = MagicMock()
+    client.query = MagicMock(side_effect=[Conflict("Already Exists"), new_job])
+    client.get_job = MagicMock(return_value=failed_job)
+
+    with FeatureDAG(dag_params={"project": "my-project"}):
+        a = BigQueryNode(name="query a", query="SELECT 1", client=client)
+
+    a.run()
+
+    first_id, retry_id = [c[1]["job_id"] for c in client.query.call_args_list]
+    assert retry_id == first_id + "_1"
+    new_job.result.assert_called_once_with(timeout=None)
@@ -0,0 +1,101 @@
+from feature_graph.cli import main, read_last_runs
+import pytest
+import subprocess
+import sys
+
+DAG_MODULE = """
+from feature_graph.base import FeatureDAG, FeatureNode
+
+with FeatureDAG(state_db={state_db!r}) as dag:
+    a = FeatureNode(name="query a")
+    b = FeatureNode(name="query b")
+    c = FeatureNode(name="query c")
+
+    a >> b
+"""
+
+
+@pytest.fixture
+def dag_module(tmp_path):
+
+    state_db = str(tmp_path / "state.db")
+    module_path = tmp_path / "my_dag.py"
+    module_path.write_text(DAG_MODULE.format(state_db=state_db))
+
+    return str(module_path), state_db
+
+
+def test_plan_run_and_status(dag_module, capsys):
+
+    module_path, state_db = dag_module
+
+    main(["plan", module_path])
+    out = capsys.readouterr().out
+    assert "stale           query a" in out
+
+    main(["run", module_path, "--jobs", "2", "--targets", "query b"])
+
+    runs = read_last_runs(state_db)
+    assert sorted(r["name"] for r in runs) == ["query a", "query b"]
+    assert all(r["status"] == "success" for r in runs)
+
+    main(["status", "--state-db", state_db])
+    out = capsys.readouterr().out
+    assert out.startswith("Last run finished")
+    assert "query b" in out
+    assert "query c" not in out
+
+    main(["plan", module_path])
+    out = capsys.readouterr().out
+    assert "fresh           query a" in out
+    assert "stale           query c" in out
+
+
+def test_status_without_runs(dag_module, capsys):
+
+    module_path, state_db = dag_module
+
+    main(["plan", module_path])
+    capsys.readouterr()
+
+    main(["status", "--state-db", state_db])
+    assert "No runs recorded" in capsys.readouterr().out
+
+
+def test_status_missing_state_db(tmp_path):
+
+    with pytest.raises(FileNotFoundError):
+        main(["status", "--state-db", str(tmp_path / "missing.db")])
+
+
+def test_status_does_not_import_dag(dag_module):
+
+    module_path, state_db = dag_module
+    main(["run", module_path])
+
+    code = (
+        "import sys\n"
+        "from feature_graph.cli import main\n"
+        "main(['status', '--state-db', {!r}])\n"
+        "assert 'feature_graph.base' not in sys.modules\n"
+        "assert 'google.cloud.bigquery' not in sys.modules\n"
+    ).format(state_db)
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_compact(dag_module):
+
+    module_path, state_db = dag_module
+    main(["run", module_path])
+
+    with open(module_path) as f:
+        source = f.read()
+    with open(module_path, "w") as f:
+        f.write(source.replace('    c = FeatureNode(name="query c")\n', ""))
+
+    main(["compact", module_path])
+
+    assert sorted(r["name"] for r in read_last_runs(state_db)) == [
+        "query a",
+        "query b",
+    ]
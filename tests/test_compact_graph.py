@@ -0,0 +1,89 @@
+from feature_graph.base import FeatureDAG, FeatureNode
+from feature_graph.compact_graph import CompactGraph, is_reachable
+import pytest
+
+
+def test_from_adjacency():
+
+    graph = CompactGraph.from_adjacency([[1, 2], [3], [3], []])
+
+    assert graph.n_nodes == 4
+    assert list(graph.children[0]) == [1, 2]
+    assert list(graph.children[3]) == []
+    assert sorted(graph.parents[3]) == [1, 2]
+    assert list(graph.parents[0]) == []
+    assert list(graph.in_degrees()) == [0, 1, 1, 2]
+
+
+def test_to_adjacency_round_trip():
+
+    children = [[1, 2], [3], [3], []]
+    graph = CompactGraph.from_adjacency(children)
+
+    assert graph.to_adjacency() == children
+    assert graph.to_adjacency(parents=True) == [[], [0], [0], [1, 2]]
+
+
+def test_topological_order():
+
+    graph = CompactGraph.from_adjacency([[], [0], [1, 0], [2]])
+
+    order = list(graph.topological_order())
+
+    assert order == [3, 2, 1, 0]
+
+
+def test_topological_order_cycle():
+
+    graph = CompactGraph.from_adjacency([[1], [0]])
+
+    with pytest.raises(ValueError):
+        graph.topological_order()
+
+
+def test_dag_freeze_and_thaw():
+
+    with FeatureDAG() as dag:
+        a = FeatureNode(name="query a")
+        b = FeatureNode(name="query b")
+        a >> b
+
+    graph = dag.freeze()
+    assert dag.freeze() is graph
+    assert list(graph.children[a._index]) == [b._index]
+    assert b in a.children
+
+    # Connecting after freezing thaws the DAG
+    with dag:
+        c = FeatureNode(name="query c")
+        b >> c
+
+    assert dag._graph is None
+    assert c in b.children
+    assert b in c.parents
+    assert list(dag.freeze().topological_order()) == [0, 1, 2]
+
+    with pytest.raises(ValueError):
+        c >> a
+
+
+def test_freeze_rejects_cycle():
+
+    with FeatureDAG() as dag:
+        _ = FeatureNode(name="query a")
+        _ = FeatureNode(name="query b")
+
+    # Bypass the checks made when nodes are connected
+    dag._children = [[1], [0]]
+
+    with pytest.raises(ValueError):
+        dag.freeze()
+
+
+def test_is_reachable():
+
+    children = [[1, 2], [3], [3], [], []]
+
+    assert is_reachable(5, 0, 3, children)
+    assert not is_reachable(5, 3, 0, children)
+    assert not is_reachable(5, 0, 4, children)
@@ -1,5 +1,6 @@
-from feature_graph.base import FeatureDAG, FeatureNode
+from feature_graph.base import FeatureDAG, FeatureNode, JobPoller
 import pytest
+from hashlib import md5
 import os
 from unittest.mock import Mock
 
@@ -192,7 +193,7 @@ def test_compact_state():
     assert a.node_id not in dag._state_dict.keys()
 
 
-def test_state_stored():
+def test_state_stored(monkeypatch):
 
     with FeatureDAG() as dag:
         a = FeatureNode(name="query a")
@@ -200,18 +201,19 @@ def test_state_stored():
     assert a.is_node_stale is True
 
     # Mock the run function to ensure it's called
-    a.run = Mock()
+    run = Mock()
+    monkeypatch.setattr(FeatureNode, "run", run)
 
     dag.run_feature_graph()
 
-    a.run.assert_called_once()
+    run.assert_called_once()
 
     assert a.is_node_stale is False
 
     # Re-run DAG and ensure node is no re-run
-    a.run.reset_mock()
+    run.reset_mock()
     dag.run_feature_graph()
-    a.run.assert_not_called()
+    run.assert_not_called()
 
 
 def test_clear_state():
@@ -253,3 +255,328 @@ def test_state_stored_with_file():
     assert a.is_node_stale is False
 
     os.remove(state_db)
+
+
+class RecordingNode(FeatureNode):
+    run_order = []
+
+    def run(self):
+        self.run_order.append(self)
+
+
+def test_nodes_run_in_dependency_order():
+
+    with FeatureDAG() as dag:
+        a = RecordingNode(name="query a")
+        b = RecordingNode(name="query b")
+        c = RecordingNode(name="query c")
+        d = RecordingNode(name="query d")
+
+        a >> [b, c] >> d
+
+    dag.run_feature_graph()
+
+    run_order = RecordingNode.run_order
+    assert len(run_order) == 4
+    assert run_order[0] is a
+    assert run_order[-1] is d
+
+
+def test_nodes_have_no_instance_dict():
+
+    with FeatureDAG():
+        a = FeatureNode(name="Query A")
+
+    assert not hasattr(a, "__dict__")
+    assert a.node_id == md5("query a".encode("utf-8")).hexdigest()
+
+
+class FakeJobPoller(JobPoller):
+    min_interval = 0.0
+
+    def _fetch_done_keys(self):
+        return list(self._jobs.keys())
+
+
+class AsyncNode(FeatureNode):
+    _job_poller_class = FakeJobPoller
+
+    def __init__(self, name, n_jobs=1):
+        super().__init__(name=name)
+        self.n_jobs = n_jobs
+        self.events = []
+
+    def _submit(self):
+        self.events.append("submit")
+        return ["{} job {}".format(self.name, i) for i in range(self.n_jobs)]
+
+    def _on_job_done(self, job):
+        self.events.append(job)
+        return []
+
+
+def test_async_nodes_submitted_together_and_polled():
+
+    with FeatureDAG() as dag:
+        a = AsyncNode(name="query a", n_jobs=2)
+        b = AsyncNode(name="query b")
+        c = AsyncNode(name="query c")
+
+        a >> c
+        b >> c
+
+    dag.run_feature_graph()
+
+    assert a.events == ["submit", "query a job 0", "query a job 1"]
+    assert b.events == ["submit", "query b job 0"]
+    assert c.events == ["submit", "query c job 0"]
+    assert not any(n.is_node_stale for n in [a, b, c])
+
+    # A fresh graph is not resubmitted
+    dag.run_feature_graph()
+    assert c.events == ["submit", "query c job 0"]
+
+
+def test_empty_job_list_completes_node():
+
+    with FeatureDAG() as dag:
+        a = AsyncNode(name="query a", n_jobs=0)
+        b = AsyncNode(name="query b")
+
+        a >> b
+
+    dag.run_feature_graph()
+
+    assert a.events == ["submit"]
+    assert b.events == ["submit", "query b job 0"]
+    assert not a.is_node_stale
+
+
+def test_jobs_without_poller_raise():
+
+    class NoPollerNode(FeatureNode):
+        def _submit(self):
+            return ["job"]
+
+    with FeatureDAG() as dag:
+        _ = NoPollerNode(name="query a")
+
+    with pytest.raises(TypeError):
+        dag.run_feature_graph()
+
+
+def test_job_poller_adaptive_backoff():
+
+    class NeverDonePoller(JobPoller):
+        def _fetch_done_keys(self):
+            return []
+
+    poller = NeverDonePoller()
+    poller.add("job", None)
+
+    assert poller.poll() == []
+    assert poller._interval == poller.min_interval * poller.backoff
+
+    for _ in range(50):
+        poller.poll()
+    assert poller._interval == poller.max_interval
+
+    poller.add("other job", None)
+    assert poller._interval == poller.min_interval
+
+
+def test_compile_rejects_subclass_without_record(tmp_path):
+
+    with FeatureDAG() as dag:
+        _ = RecordingNode(name="query a")
+
+    with pytest.raises(TypeError):
+        dag.compile(str(tmp_path / "dag.json"))
+
+
+def test_max_jobs_limits_nodes_in_flight():
+
+    in_flight = []
+
+    class LimitedPoller(FakeJobPoller):
+        def _fetch_done_keys(self):
+            in_flight.append(len(self._jobs))
+            return super()._fetch_done_keys()
+
+    class LimitedNode(AsyncNode):
+        _job_poller_class = LimitedPoller
+
+    with FeatureDAG() as dag:
+        _ = [LimitedNode(name="query {}".format(i)) for i in range(4)]
+
+    dag.run_feature_graph(max_jobs=2)
+
+    assert in_flight == [2, 2]
+
+
+def test_run_targets_and_ancestors_only():
+
+    with FeatureDAG() as dag:
+        a = AsyncNode(name="query a")
+        b = AsyncNode(name="query b")
+        c = AsyncNode(name="query c")
+        d = AsyncNode(name="query d")
+
+        a >> b >> c
+        a >> d
+
+    assert [n.name for n, _ in dag.plan(targets=["query b"])] == [
+        "query a",
+        "query b",
+    ]
+
+    dag.run_feature_graph(targets=["query b"])
+
+    assert not a.is_node_stale and not b.is_node_stale
+    assert c.events == [] and d.events == []
+    assert sorted(r["name"] for r in dag.last_runs().values()) == [
+        "query a",
+        "query b",
+    ]
+
+    with pytest.raises(KeyError):
+        dag.run_feature_graph(targets=["query z"])
+
+
+def test_staleness_report():
+
+    with FeatureDAG() as dag:
+        a = FeatureNode(name="query a")
+        b = FeatureNode(name="query b")
+        c = FeatureNode(name="query c")
+
+        a >> b >> c
+
+    b._update_cache(b._calc_current_cache_tag())
+    c._update_cache(c._calc_current_cache_tag())
+
+    report = dag.staleness_report(max_workers=2)
+
+    assert [n.name for n in report.nodes] == ["query a", "query b", "query c"]
+    assert [n.name for n in report.stale] == ["query a"]
+    assert [n.name for n in report.fresh] == ["query b", "query c"]
+    assert [n.is_upstream_stale for n in report.nodes] == [False, True, True]
+    assert report.nodes[0].state_cache_tag is None
+    assert report.nodes[1].current_cache_tag == "True"
+
+
+def test_staleness_report_diagram_colours():
+
+    with FeatureDAG() as dag:
+        a = FeatureNode(name="query a")
+        b = FeatureNode(name="query b")
+        c = FeatureNode(name="query c")
+
+        a >> b
+        b._update_cache(b._calc_current_cache_tag())
+        c._update_cache(c._calc_current_cache_tag())
+
+    report = dag.staleness_report()
+    dag._repr_png_ = Mock(return_value=b"png")
+
+    assert report._repr_png_() == b"png"
+    node_dot_attr = dag._repr_png_.call_args[1]["node_dot_attr"]
+    assert node_dot_attr[a.node_id]["fillcolor"] == report.stale_color
+    assert node_dot_attr[b.node_id]["fillcolor"] == report.upstream_stale_color
+    assert node_dot_attr[c.node_id]["fillcolor"] == report.fresh_color
+
+
+class HangingJobPoller(JobPoller):
+    "Jobs never finish, unless they are named as failed"
+
+    min_interval = 0.01
+    cancelled = []
+
+    def _fetch_done_keys(self):
+        for key in list(self._jobs.keys()):
+            if "fails" in key:
+                self._pop_failed(key)
+                raise RuntimeError("job failed")
+        return []
+
+    def _cancel_job(self, job):
+        self.cancelled.append(job)
+
+
+class HangingNode(AsyncNode):
+    _job_poller_class = HangingJobPoller
+
+
+def test_failed_node_cancels_in_flight_jobs():
+
+    HangingJobPoller.cancelled = []
+
+    class FailingNode(FeatureNode):
+        def run(self):
+            raise RuntimeError("node failed")
+
+    with FeatureDAG() as dag:
+        a = HangingNode(name="query a", n_jobs=2)
+        b = FailingNode(name="query b")
+        c = AsyncNode(name="query c")
+
+        b >> c
+
+    with pytest.raises(RuntimeError):
+        dag.run_feature_graph()
+
+    assert HangingJobPoller.cancelled == ["query a job 0", "query a job 1"]
+    runs = dag.last_runs()
+    assert runs[a.node_id]["status"] == "cancelled"
+    assert runs[b.node_id]["status"] == "failed"
+    assert c.node_id not in runs
+    assert a._get_state_cache_tag is None
+    assert b._get_state_cache_tag is None
+
+
+def test_failed_job_cancels_other_nodes():
+
+    HangingJobPoller.cancelled = []
+
+    with FeatureDAG() as dag:
+        a = HangingNode(name="query a")
+        b = HangingNode(name="query fails")
+
+    with pytest.raises(RuntimeError):
+        dag.run_feature_graph()
+
+    assert HangingJobPoller.cancelled == ["query a job 0"]
+    runs = dag.last_runs()
+    assert runs[a.node_id]["status"] == "cancelled"
+    assert runs[b.node_id]["status"] == "failed"
+    assert a._get_state_cache_tag is None
+    assert b._get_state_cache_tag is None
+
+
+def test_node_timeout(monkeypatch):
+
+    HangingJobPoller.cancelled = []
+    monkeypatch.setattr(HangingNode, "_timeout", 0.05, raising=False)
+
+    with FeatureDAG() as dag:
+        a = HangingNode(name="query a")
+
+    with pytest.raises(TimeoutError, match="query a"):
+        dag.run_feature_graph()
+
+    assert HangingJobPoller.cancelled == ["query a job 0"]
+    assert dag.last_runs()[a.node_id]["status"] == "cancelled"
+    assert a._get_state_cache_tag is None
+
+
+def test_run_timeout():
+
+    HangingJobPoller.cancelled = []
+
+    with FeatureDAG() as dag:
+        _ = HangingNode(name="query a")
+
+    with pytest.raises(TimeoutError, match="run"):
+        dag.run_feature_graph(timeout=0.05)
+
+    assert HangingJobPoller.cancelled == ["query a job 0"]
@@ -0,0 +1,91 @@
+from feature_graph.base import FeatureDAG
+from feature_graph import file_node
+from feature_graph.file_node import FileNode, hash_file
+import hashlib
+import os
+import pytest
+from unittest.mock import Mock
+
+
+def write_file(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+    return str(path)
+
+
+def test_hash_file(tmp_path, monkeypatch):
+
+    monkeypatch.setattr(file_node, "HASH_CHUNK_SIZE", 3)
+
+    data = b"0123456789"
+    path = write_file(tmp_path / "data.csv", data)
+    empty_path = write_file(tmp_path / "empty.csv", b"")
+
+    assert hash_file(path) == hashlib.md5(data).hexdigest()
+    assert hash_file(empty_path) == hashlib.md5(b"").hexdigest()
+
+
+def test_cache_tag_changes_with_contents(tmp_path):
+
+    path_a = write_file(tmp_path / "a.csv", b"a")
+    path_b = write_file(tmp_path / "b.csv", b"b")
+
+    with FeatureDAG():
+        node = FileNode(name="files", input_files=[path_b, path_a])
+        single = FileNode(name="single file", input_files=path_a)
+
+    cache_tag = node._calc_current_cache_tag()
+    assert node._calc_current_cache_tag() == cache_tag
+    assert single._calc_current_cache_tag() != cache_tag
+
+    write_file(tmp_path / "a.csv", b"changed")
+    assert node._calc_current_cache_tag() != cache_tag
+
+
+def test_fingerprint_reused_when_mtime_and_size_unchanged(tmp_path, monkeypatch):
+
+    path = write_file(tmp_path / "a.csv", b"a")
+
+    with FeatureDAG() as dag:
+        node = FileNode(name="files", input_files=path)
+
+    node._calc_current_cache_tag()
+    assert (
+        dag._state_table("fingerprints")[path]["md5"] == hashlib.md5(b"a").hexdigest()
+    )
+
+    hash_mock = Mock(return_value="hash")
+    monkeypatch.setattr(file_node, "hash_file", hash_mock)
+
+    node._calc_current_cache_tag()
+    hash_mock.assert_not_called()
+
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    node._calc_current_cache_tag()
+    hash_mock.assert_called_once_with(path)
+
+
+def test_missing_input_file(tmp_path):
+
+    with FeatureDAG():
+        node = FileNode(name="files", input_files=str(tmp_path / "missing.csv"))
+
+    with pytest.raises(FileNotFoundError):
+        node._calc_current_cache_tag()
+
+
+def test_run_calls_func(tmp_path):
+
+    path = write_file(tmp_path / "a.csv", b"a")
+    func = Mock()
+
+    with FeatureDAG() as dag:
+        node = FileNode(name="files", input_files=path, func=func)
+
+    dag.run_feature_graph()
+    func.assert_called_once_with([path])
+    assert node.is_node_stale is False
+
+    dag.run_feature_graph()
+    func.assert_called_once()
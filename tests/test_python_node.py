@@ -0,0 +1,107 @@
+from feature_graph.base import FeatureDAG
+import os
+import pytest
+import time
+
+pa = pytest.importorskip("pyarrow")
+
+from feature_graph.python_node import ArrowCache, PythonNode  # noqa: E402
+
+calls = []
+
+
+def load_sales(inputs):
+    calls.append("load_sales")
+    return pa.table({"store": [1, 1, 2], "amount": [2.0, 3.0, 4.0]})
+
+
+def total_sales(inputs):
+    calls.append("total_sales")
+    return inputs["sales"].group_by("store").aggregate([("amount", "sum")])
+
+
+def test_cache_round_trip_is_memory_mapped(tmp_path):
+
+    cache = ArrowCache(str(tmp_path))
+    table = pa.table({"a": list(range(1000))})
+
+    assert cache.get("key") is None
+    cache.put("key", table)
+    assert "key" in cache
+
+    cached = cache.get("key")
+    assert cached.equals(table)
+    # Buffers point into the memory mapped file rather than a copy
+    assert not cached.column("a").chunks[0].buffers()[1].is_mutable
+
+
+def test_cache_lru_eviction(tmp_path):
+
+    table = pa.table({"a": list(range(1000))})
+    cache = ArrowCache(str(tmp_path))
+    cache.put("size", table)
+    size = os.path.getsize(cache.path("size"))
+
+    cache = ArrowCache(str(tmp_path / "lru"), max_bytes=size * 2)
+    cache.put("a", table)
+    time.sleep(0.01)
+    cache.put("b", table)
+    time.sleep(0.01)
+    # Reading a makes b the least recently used
+    cache.get("a")
+    time.sleep(0.01)
+    cache.put("c", table)
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+
+
+def test_run_dag_and_warm_rerun(tmp_path):
+
+    calls.clear()
+
+    with FeatureDAG(dag_params={"cache_dir": str(tmp_path)}) as dag:
+        sales = PythonNode(name="sales", func=load_sales)
+        totals = PythonNode(name="totals", func=total_sales)
+
+        sales >> totals
+
+    dag.run_feature_graph()
+
+    assert calls == ["load_sales", "total_sales"]
+    assert totals.output.sort_by("store").column("amount_sum").to_pylist() == [
+        5.0,
+        4.0,
+    ]
+
+    # Fresh nodes aren't rerun
+    dag.run_feature_graph()
+    assert calls == ["load_sales", "total_sales"]
+
+    # A new DAG with empty state reuses the cached outputs
+    with FeatureDAG(dag_params={"cache_dir": str(tmp_path)}) as dag:
+        sales = PythonNode(name="sales", func=load_sales)
+        totals = PythonNode(name="totals", func=total_sales)
+
+        sales >> totals
+
+    dag.run_feature_graph()
+    assert calls == ["load_sales", "total_sales"]
+    assert totals.output.num_rows == 2
+
+
+def test_cache_dir_required():
+
+    with FeatureDAG():
+        with pytest.raises(LookupError):
+            _ = PythonNode(name="sales", func=load_sales)
+
+
+def test_output_before_run(tmp_path):
+
+    with FeatureDAG(dag_params={"cache_dir": str(tmp_path)}):
+        sales = PythonNode(name="sales", func=load_sales)
+
+    with pytest.raises(LookupError):
+        _ = sales.output
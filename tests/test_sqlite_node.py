@@ -0,0 +1,96 @@
+from feature_graph.base import FeatureDAG
+from feature_graph.sqlite_node import SQLiteNode, bump_table_versions
+import pytest
+import sqlite3
+
+
+@pytest.fixture
+def database(tmp_path):
+
+    database = str(tmp_path / "features.db")
+    conn = sqlite3.connect(database)
+    with conn:
+        conn.execute("CREATE TABLE sales (store INTEGER, amount REAL)")
+        conn.executemany("INSERT INTO sales VALUES (?, ?)", [(1, 2.0), (1, 3.0)])
+    conn.close()
+
+    return database
+
+
+def read(database, query):
+    conn = sqlite3.connect(database)
+    try:
+        return conn.execute(query).fetchall()
+    finally:
+        conn.close()
+
+
+def test_database_from_dag_params(database):
+
+    with FeatureDAG(dag_params={"database": database}):
+        a = SQLiteNode(name="query a", query="SELECT 1")
+
+    assert a.database == database
+
+    with FeatureDAG():
+        with pytest.raises(LookupError):
+            _ = SQLiteNode(name="query a", query="SELECT 1")
+
+
+def test_shared_query_handling():
+
+    with FeatureDAG(dag_params={"database": ":memory:"}):
+        a = SQLiteNode(
+            name="query a", query="SELECT {value}", query_params={"value": 1}
+        )
+        with pytest.raises(ValueError):
+            _ = SQLiteNode(name="query b")
+
+    assert a.query == "SELECT 1"
+
+
+def test_run_dag(database):
+
+    with FeatureDAG(dag_params={"database": database}) as dag:
+        totals = SQLiteNode(
+            name="totals",
+            query="""
+                DROP TABLE IF EXISTS store_totals;
+                CREATE TABLE store_totals AS
+                SELECT store, SUM(amount) AS total FROM sales GROUP BY store;
+            """,
+            input_tables="sales",
+        )
+        doubled = SQLiteNode(
+            name="doubled",
+            query="""
+                DROP TABLE IF EXISTS doubled_totals;
+                CREATE TABLE doubled_totals AS
+                SELECT store, total * 2 AS total FROM store_totals;
+            """,
+            input_tables="store_totals",
+        )
+
+        totals >> doubled
+
+    dag.run_feature_graph()
+
+    assert read(database, "SELECT * FROM doubled_totals") == [(1, 10.0)]
+    assert not totals.is_node_stale
+    assert not doubled.is_node_stale
+
+    # An external write to an input table makes its readers stale
+    conn = sqlite3.connect(database)
+    with conn:
+        conn.execute("INSERT INTO sales VALUES (1, 5.0)")
+    bump_table_versions(conn, ["sales"])
+    conn.close()
+
+    assert totals.is_node_stale
+    assert not doubled.is_node_stale
+
+    # Rerunning totals rewrites store_totals so doubled reruns too
+    dag.run_feature_graph()
+
+    assert read(database, "SELECT * FROM doubled_totals") == [(1, 20.0)]
+    assert not doubled.is_node_stale
@@ -0,0 +1,191 @@
+from feature_graph.base import FeatureDAG, FeatureNode, JobPoller
+from feature_graph.hooks import FeatureDAGHooks
+from feature_graph.tracing import Tracer
+import json
+import pytest
+
+
+class FakeJobPoller(JobPoller):
+    min_interval = 0.0
+
+    def _fetch_done_keys(self):
+        return list(self._jobs.keys())
+
+
+class AsyncNode(FeatureNode):
+    _job_poller_class = FakeJobPoller
+
+    def _submit(self):
+        return ["{} job".format(self.name)]
+
+
+class FailingNode(FeatureNode):
+    def run(self):
+        raise RuntimeError("node failed")
+
+
+class RecordingHooks(FeatureDAGHooks):
+    def __init__(self):
+        self.calls = []
+
+    def on_run_start(self, targets):
+        self.calls.append(("run_start", targets))
+
+    def on_run_end(self, error):
+        self.calls.append(("run_end", error))
+
+    def on_plan_start(self, targets):
+        self.calls.append(("plan_start", targets))
+
+    def on_plan_end(self):
+        self.calls.append(("plan_end",))
+
+    def on_node_ready(self, node):
+        self.calls.append(("ready", node.name))
+
+    def on_tag_computed(self, node, cache_tag, duration):
+        assert duration >= 0
+        self.calls.append(("tag", node.name, cache_tag))
+
+    def on_node_start(self, node):
+        self.calls.append(("start", node.name))
+
+    def on_node_end(self, node, status):
+        self.calls.append(("end", node.name, status))
+
+    def on_state_write(self, node, cache_tag, duration):
+        self.calls.append(("state", node.name, cache_tag))
+
+
+def test_hooks_called_in_order():
+
+    with FeatureDAG() as dag:
+        a = FeatureNode(name="node a")
+        b = AsyncNode(name="node b")
+
+        a >> b
+
+    hooks = RecordingHooks()
+    dag.add_hooks(hooks)
+    dag.run_feature_graph()
+
+    assert hooks.calls == [
+        ("run_start", None),
+        ("ready", "node a"),
+        ("tag", "node a", "True"),
+        ("start", "node a"),
+        ("state", "node a", "True"),
+        ("end", "node a", "success"),
+        ("ready", "node b"),
+        ("tag", "node b", "True"),
+        ("start", "node b"),
+        ("state", "node b", "True"),
+        ("end", "node b", "success"),
+        ("run_end", None),
+    ]
+
+    # Fresh nodes are checked but not run
+    hooks.calls = []
+    dag.run_feature_graph()
+    assert ("start", "node a") not in hooks.calls
+    assert ("tag", "node a", "True") in hooks.calls
+
+    hooks.calls = []
+    dag.staleness_report(targets=["node a"])
+    assert hooks.calls == [
+        ("plan_start", ["node a"]),
+        ("tag", "node a", "True"),
+        ("plan_end",),
+    ]
+
+    dag.remove_hooks(hooks)
+    hooks.calls = []
+    dag.run_feature_graph()
+    assert hooks.calls == []
+
+
+def test_run_end_hook_receives_error():
+
+    with FeatureDAG() as dag:
+        FailingNode(name="node a")
+
+    hooks = RecordingHooks()
+    dag.add_hooks(hooks)
+
+    with pytest.raises(RuntimeError):
+        dag.run_feature_graph()
+
+    assert isinstance(hooks.calls[-1][1], RuntimeError)
+
+
+def test_tracer_spans(tmp_path):
+
+    with FeatureDAG() as dag:
+        a = FeatureNode(name="node a")
+        b = AsyncNode(name="node b")
+
+        a >> b
+
+    tracer = Tracer()
+    dag.add_hooks(tracer)
+    dag.run_feature_graph()
+
+    spans = tracer.spans
+    root = spans[-1]
+    assert root.name == "run_feature_graph"
+    assert root.parent_span_id is None
+    assert sorted((s.node_name, s.name) for s in spans[:-1]) == [
+        ("node a", "cache_tag"),
+        ("node a", "queued"),
+        ("node a", "run"),
+        ("node a", "state_write"),
+        ("node b", "cache_tag"),
+        ("node b", "queued"),
+        ("node b", "run"),
+        ("node b", "state_write"),
+    ]
+    for span in spans[:-1]:
+        assert span.trace_id == root.trace_id
+        assert span.parent_span_id == root.span_id
+        assert root.start_ns <= span.start_ns <= span.end_ns <= root.end_ns
+
+    chrome_file = str(tmp_path / "trace.json")
+    tracer.write_chrome_trace(chrome_file)
+    with open(chrome_file) as f:
+        trace = json.load(f)
+    events = [e for e in trace["traceEvents"] if e["ph"] == "X"]
+    assert len(events) == 9
+    thread_names = {
+        e["tid"]: e["args"]["name"] for e in trace["traceEvents"] if e["ph"] == "M"
+    }
+    assert thread_names == {0: "feature_graph", 1: "node a", 2: "node b"}
+
+    otlp_file = str(tmp_path / "trace_otlp.json")
+    tracer.write_otlp_json(otlp_file)
+    with open(otlp_file) as f:
+        otlp = json.load(f)
+    otlp_spans = otlp["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert len(otlp_spans) == 9
+    assert {s["traceId"] for s in otlp_spans} == {root.trace_id}
+    assert all(
+        int(s["endTimeUnixNano"]) >= int(s["startTimeUnixNano"]) for s in otlp_spans
+    )
+
+    tracer.clear()
+    assert tracer.spans == []
+
+
+def test_tracer_marks_failed_run():
+
+    with FeatureDAG() as dag:
+        FailingNode(name="node a")
+
+    tracer = Tracer()
+    dag.add_hooks(tracer)
+
+    with pytest.raises(RuntimeError):
+        dag.run_feature_graph()
+
+    root = tracer.spans[-1]
+    assert root.is_error
+    assert "node failed" in root.attributes["error"]